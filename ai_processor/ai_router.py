@@ -1,33 +1,69 @@
 # ai_processor/ai_router.py
 import os
-import requests
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.cache import SQLiteStore
 from utils.config import get_api_key
+from utils.http_client import post_json
 
-def call_groq(prompt, system_prompt="", model="llama3-70b-8192"):
+logger = logging.getLogger(__name__)
+
+TEMPERATURE = 0.3
+MAX_TOKENS = 1500
+HF_MAX_NEW_TOKENS = 1024
+
+# API base URLs; override to point a provider at a proxy or a local stub
+GROQ_API_BASE = os.environ.get("GROQ_API_BASE", "https://api.groq.com/openai/v1")
+TOGETHER_API_BASE = os.environ.get("TOGETHER_API_BASE", "https://api.together.xyz/v1")
+OPENROUTER_API_BASE = os.environ.get("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
+HUGGINGFACE_API_BASE = os.environ.get("HUGGINGFACE_API_BASE", "https://api-inference.huggingface.co/models")
+
+# Completions keyed by everything that determines them; see _cache_key
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_DISABLED", "0") != "1"
+response_cache = SQLiteStore(
+    os.environ.get("LLM_CACHE_PATH", os.path.join(tempfile.gettempdir(), "ats_llm_cache.sqlite")),
+    table="completions",
+    dumps=lambda text: text.encode("utf-8"),
+    loads=lambda blob: bytes(blob).decode("utf-8"),
+    ttl=float(os.environ.get("LLM_CACHE_TTL", "86400")),
+    max_bytes=int(os.environ.get("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+) if LLM_CACHE_ENABLED else None
+
+def call_groq(prompt, system_prompt="", model="llama3-70b-8192", stream=False):
     return _call_openai_style(
-        url="https://api.groq.com/openai/v1/chat/completions",
+        url=f"{GROQ_API_BASE}/chat/completions",
         key_env="GROQ_API_KEY",
+        provider="groq",
         model=model,
         prompt=prompt,
-        system_prompt=system_prompt
+        system_prompt=system_prompt,
+        stream=stream
     )
 
-def call_together(prompt, system_prompt="", model="togethercomputer/Command-R+"):
+def call_together(prompt, system_prompt="", model="togethercomputer/Command-R+", stream=False):
     return _call_openai_style(
-        url="https://api.together.xyz/v1/chat/completions",
+        url=f"{TOGETHER_API_BASE}/chat/completions",
         key_env="TOGETHER_API_KEY",
+        provider="together",
         model=model,
         prompt=prompt,
-        system_prompt=system_prompt
+        system_prompt=system_prompt,
+        stream=stream
     )
 
-def call_openrouter(prompt, system_prompt="", model="openai/gpt-4-turbo"):
+def call_openrouter(prompt, system_prompt="", model="openai/gpt-4-turbo", stream=False):
     return _call_openai_style(
-        url="https://openrouter.ai/api/v1/chat/completions",
+        url=f"{OPENROUTER_API_BASE}/chat/completions",
         key_env="OPENROUTER_API_KEY",
+        provider="openrouter",
         model=model,
         prompt=prompt,
-        system_prompt=system_prompt
+        system_prompt=system_prompt,
+        stream=stream
     )
 
 def call_huggingface(prompt, system_prompt="", model="mistralai/Mistral-7B-Instruct-v0.1"):
@@ -36,7 +72,7 @@ def call_huggingface(prompt, system_prompt="", model="mistralai/Mistral-7B-Instr
     Assumes use of HuggingFace Inference API.
     """
     api_key = get_api_key("HUGGINGFACE_API_KEY")
-    url = f"https://api-inference.huggingface.co/models/{model}"
+    url = f"{HUGGINGFACE_API_BASE}/{model}"
 
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -47,12 +83,12 @@ def call_huggingface(prompt, system_prompt="", model="mistralai/Mistral-7B-Instr
         "inputs": f"[INST] <<SYS>> {system_prompt} <</SYS>> {prompt} [/INST]",
         "parameters": {
             "return_full_text": False,
-            "temperature": 0.3,
-            "max_new_tokens": 1024
+            "temperature": TEMPERATURE,
+            "max_new_tokens": HF_MAX_NEW_TOKENS
         }
     }
 
-    response = requests.post(url, headers=headers, json=payload)
+    response = post_json("huggingface", url, headers=headers, json=payload)
     response.raise_for_status()
     result = response.json()
 
@@ -62,7 +98,7 @@ def call_huggingface(prompt, system_prompt="", model="mistralai/Mistral-7B-Instr
     else:
         raise ValueError(f"Hugging Face API Error: {result}")
 
-def _call_openai_style(url, key_env, model, prompt, system_prompt):
+def _call_openai_style(url, key_env, model, prompt, system_prompt, provider, stream=False):
     api_key = get_api_key(key_env)
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -74,48 +110,338 @@ def _call_openai_style(url, key_env, model, prompt, system_prompt):
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt}
         ],
-        "max_tokens": 1500,
-        "temperature": 0.3
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE
     }
-    response = requests.post(url, headers=headers, json=body)
+    if stream:
+        body["stream"] = True
+    response = post_json(provider, url, headers=headers, json=body, stream=stream)
+    response.raise_for_status()
+    if stream:
+        return _iter_stream(response)
     result = response.json()
     return result['choices'][0]['message']['content'].strip()
+
+def _iter_stream(response):
+    """
+    Yield content deltas from an OpenAI-style server-sent event stream.
+    Lines are decoded as UTF-8 explicitly: requests would assume ISO-8859-1
+    for a text/event-stream without a charset.
+    """
+    try:
+        for raw_line in response.iter_lines():
+            line = raw_line.decode("utf-8").strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or [{}]
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                yield content
+    finally:
+        response.close()
 # ai_processor/ai_router.py
 
-def query_ai_model(prompt, provider="groq", model="mixtral"):
+PROVIDER_KEY_ENVS = {
+    "groq": "GROQ_API_KEY",
+    "together": "TOGETHER_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+    "huggingface": "HUGGINGFACE_API_KEY",
+}
+
+# Models used when the router picks the provider (provider="auto")
+DEFAULT_MODELS = {
+    "groq": "llama3-70b-8192",
+    "together": "togethercomputer/Command-R+",
+    "openrouter": "openai/gpt-4-turbo",
+    "huggingface": "mistralai/Mistral-7B-Instruct-v0.1",
+}
+
+def _cache_key(provider, model, system_prompt, prompt):
+    max_tokens = HF_MAX_NEW_TOKENS if provider == "huggingface" else MAX_TOKENS
+    parts = [provider, model, system_prompt, prompt, repr(TEMPERATURE), str(max_tokens)]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+def _complete(prompt, provider, model):
     if provider == "groq":
-        return parse_json_response(call_groq(prompt, model=model))
+        return call_groq(prompt, model=model)
     elif provider == "together":
-        return parse_json_response(call_together(prompt, model=model))
+        return call_together(prompt, model=model)
     elif provider == "openrouter":
-        return parse_json_response(call_openrouter(prompt, model=model))
+        return call_openrouter(prompt, model=model)
     elif provider == "huggingface":
-        return parse_json_response(call_huggingface(prompt, model=model))
+        return call_huggingface(prompt, model=model)
     else:
         raise ValueError(f"Unsupported provider: {provider}")
-import json
-import re
 
-def parse_json_response(response_text):
+def _open_stream(prompt, provider, model):
+    if provider == "groq":
+        return call_groq(prompt, model=model, stream=True)
+    elif provider == "together":
+        return call_together(prompt, model=model, stream=True)
+    elif provider == "openrouter":
+        return call_openrouter(prompt, model=model, stream=True)
+    elif provider == "huggingface":
+        return iter([call_huggingface(prompt, model=model)])
+    else:
+        raise ValueError(f"Unsupported provider: {provider}")
+
+class ProviderRouter:
     """
-    Try to extract and parse JSON from an LLM response.
-    This handles cases where the response has extra commentary or formatting.
+    Picks LLM providers by observed latency and reliability.
+
+    Every call updates an EWMA of the provider's latency and error rate. A
+    provider whose error rate crosses max_error_rate is skipped for `cooldown`
+    seconds, then gets another chance. complete() sends the request to the
+    fastest healthy provider; if it has not answered after hedge_delay seconds
+    a duplicate goes to the next one and the first answer wins. Errors fail
+    over to the next provider immediately.
+
+    A hedged request that loses keeps running in the pool until its HTTP
+    timeout (Python threads cannot be interrupted); its result is discarded
+    but its latency still feeds the statistics.
     """
+
+    def __init__(self, providers, alpha=0.3, hedge_delay=8.0, max_error_rate=0.5, cooldown=30.0, max_workers=16):
+        self.providers = list(providers)
+        self.alpha = alpha
+        self.hedge_delay = hedge_delay
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._stats = {
+            provider: {"latency": None, "error_rate": 0.0, "calls": 0, "errors": 0,
+                       "hedges": 0, "hedges_won": 0, "cooldown_until": 0.0}
+            for provider in self.providers
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-router")
+
+    def is_configured(self, provider):
+        return bool(os.getenv(PROVIDER_KEY_ENVS.get(provider, "")))
+
+    def record(self, provider, latency, ok):
+        with self._lock:
+            stats = self._stats.setdefault(provider, {"latency": None, "error_rate": 0.0, "calls": 0, "errors": 0,
+                                                      "hedges": 0, "hedges_won": 0, "cooldown_until": 0.0})
+            stats["calls"] += 1
+            stats["error_rate"] = (1 - self.alpha) * stats["error_rate"] + self.alpha * (0.0 if ok else 1.0)
+            if ok:
+                previous = stats["latency"]
+                stats["latency"] = latency if previous is None else (1 - self.alpha) * previous + self.alpha * latency
+            else:
+                stats["errors"] += 1
+                if stats["error_rate"] >= self.max_error_rate:
+                    stats["cooldown_until"] = time.monotonic() + self.cooldown
+
+    def ranked(self):
+        """
+        Configured providers, fastest healthy first. Providers with no latency
+        sample yet keep their configured order after the measured ones; those
+        cooling down come last, as a final resort.
+        """
+        now = time.monotonic()
+        with self._lock:
+            configured = [p for p in self.providers if self.is_configured(p)]
+            healthy = [p for p in configured if self._stats[p]["cooldown_until"] <= now]
+            cooling = sorted((p for p in configured if p not in healthy), key=lambda p: self._stats[p]["cooldown_until"])
+            measured = sorted(
+                (p for p in healthy if self._stats[p]["latency"] is not None),
+                key=lambda p: self._stats[p]["latency"] * (1.0 + self._stats[p]["error_rate"])
+            )
+            unmeasured = [p for p in healthy if self._stats[p]["latency"] is None]
+        return measured + unmeasured + cooling
+
+    def call(self, provider, prompt, model):
+        """One timed completion from a specific provider"""
+        start = time.monotonic()
+        try:
+            text = _complete(prompt, provider, model)
+        except Exception:
+            self.record(provider, time.monotonic() - start, ok=False)
+            raise
+        self.record(provider, time.monotonic() - start, ok=True)
+        return text
+
+    def complete(self, prompt, candidates=None):
+        """Hedged completion across providers; returns (provider, text)"""
+        candidates = list(candidates or self.ranked())
+        if not candidates:
+            raise ValueError("No AI provider is configured. Set at least one provider API key.")
+
+        futures = {}
+        errors = []
+        hedged = False
+        primary = candidates[0]
+
+        def launch():
+            provider = candidates.pop(0)
+            futures[self._executor.submit(self.call, provider, prompt, DEFAULT_MODELS[provider])] = provider
+
+        launch()
+        while futures:
+            can_hedge = candidates and not hedged and self.hedge_delay > 0
+            done, _ = wait(futures, timeout=self.hedge_delay if can_hedge else None, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                with self._lock:
+                    self._stats[candidates[0]]["hedges"] += 1
+                logger.info(f"{primary} slower than {self.hedge_delay}s; hedging with {candidates[0]}")
+                launch()
+                continue
+
+            for future in done:
+                provider = futures.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    errors.append(f"{provider}: {e}")
+                    continue
+                for other in futures:
+                    other.cancel()
+                if provider != primary:
+                    with self._lock:
+                        self._stats[provider]["hedges_won"] += 1
+                return provider, text
+
+            # Everything that finished failed: fail over without waiting for the hedge timer
+            if candidates and len(futures) < 2:
+                launch()
+
+        raise ValueError(f"All AI providers failed: {'; '.join(errors)}")
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                provider: {
+                    "configured": self.is_configured(provider),
+                    "latency_ewma": round(stats["latency"], 3) if stats["latency"] is not None else None,
+                    "error_rate_ewma": round(stats["error_rate"], 3),
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "hedges": stats["hedges"],
+                    "hedges_won": stats["hedges_won"],
+                    "cooling_down": stats["cooldown_until"] > now,
+                }
+                for provider, stats in self._stats.items()
+            }
+
+router = ProviderRouter(
+    [p.strip() for p in os.environ.get("AI_PROVIDERS", "groq,together,openrouter,huggingface").split(",") if p.strip()],
+    hedge_delay=float(os.environ.get("AI_HEDGE_DELAY", "8")),
+    max_error_rate=float(os.environ.get("AI_MAX_ERROR_RATE", "0.5")),
+    cooldown=float(os.environ.get("AI_PROVIDER_COOLDOWN", "30"))
+)
+
+def _candidates(provider, model):
+    """(provider, model) pairs to try: the router's ranking for "auto", else just the one given"""
+    if provider == "auto":
+        return [(p, DEFAULT_MODELS[p]) for p in router.ranked()]
+    if provider not in DEFAULT_MODELS:
+        raise ValueError(f"Unsupported provider: {provider}")
+    return [(provider, model or DEFAULT_MODELS[provider])]
+
+def query_ai_model(prompt, provider="groq", model="mixtral", use_cache=True):
+    """
+    Send prompt to the provider and parse the JSON in its reply.
+    provider="auto" lets the latency-aware router choose, with hedging and
+    failover. Identical requests within LLM_CACHE_TTL are answered from the
+    local response cache; pass use_cache=False to force a fresh completion.
+    Only replies that parse as JSON are cached, so retrying after a bad
+    reply asks the provider again.
+    """
+    candidates = _candidates(provider, model)
+    if use_cache and response_cache is not None:
+        for candidate, candidate_model in candidates:
+            text = response_cache.get(_cache_key(candidate, candidate_model, "", prompt))
+            parsed = _extract_json(text) if text is not None else None
+            if parsed is not None:
+                return parsed
+
+    if provider == "auto":
+        provider, text = router.complete(prompt, [candidate for candidate, _ in candidates])
+        model = DEFAULT_MODELS[provider]
+    else:
+        model = candidates[0][1]
+        text = router.call(provider, prompt, model)
+    parsed = _extract_json(text)
+    if parsed is None:
+        return parse_json_response(text)
+    if response_cache is not None:
+        response_cache.put(_cache_key(provider, model, "", prompt), text)
+    return parsed
+
+def stream_ai_model(prompt, provider="groq", model="mixtral", use_cache=True):
+    """
+    Like query_ai_model, but yields the raw completion text as it is generated,
+    leaving parsing to the caller. A cached completion is yielded in one piece;
+    a fresh one is cached once the stream completes, if it parses as JSON. With provider="auto" a
+    provider that fails before its first fragment is replaced by the next one
+    (streams are not hedged). The Hugging Face endpoint is not streamed: its
+    whole reply arrives as a single fragment.
+    """
+    candidates = _candidates(provider, model)
+    if use_cache and response_cache is not None:
+        for candidate, candidate_model in candidates:
+            cached = response_cache.get(_cache_key(candidate, candidate_model, "", prompt))
+            if cached is not None and _extract_json(cached) is not None:
+                yield cached
+                return
+    if not candidates:
+        raise ValueError("No AI provider is configured. Set at least one provider API key.")
+
+    errors = []
+    for candidate, candidate_model in candidates:
+        start = time.monotonic()
+        received = []
+        try:
+            for fragment in _open_stream(prompt, candidate, candidate_model):
+                received.append(fragment)
+                yield fragment
+        except Exception as e:
+            router.record(candidate, time.monotonic() - start, ok=False)
+            if received:
+                raise
+            errors.append(f"{candidate}: {e}")
+            continue
+        router.record(candidate, time.monotonic() - start, ok=True)
+        text = "".join(received).strip()
+        if response_cache is not None and _extract_json(text) is not None:
+            response_cache.put(_cache_key(candidate, candidate_model, "", prompt), text)
+        return
+
+    raise ValueError(f"All AI providers failed: {'; '.join(errors)}")
+import json
+import re
+
+def _extract_json(response_text):
+    """The JSON object in an LLM response, allowing for extra commentary around it, or None"""
     try:
         # Attempt direct parsing
         return json.loads(response_text)
-    except json.JSONDecodeError:
+    except (TypeError, json.JSONDecodeError):
         # Try to extract JSON using regex (best-effort fallback)
-        match = re.search(r"\{.*\}", response_text, re.DOTALL)
+        match = re.search(r"\{.*\}", response_text or "", re.DOTALL)
         if match:
             try:
                 return json.loads(match.group())
             except json.JSONDecodeError:
                 pass
+    return None
 
-        # Fallback structure if parsing fails
-        return {
-            "suggestions": ["Could not parse response as JSON."],
-            "optimized_resume": response_text
-        }
+def parse_json_response(response_text):
+    """
+    Try to extract and parse JSON from an LLM response.
+    This handles cases where the response has extra commentary or formatting.
+    """
+    parsed = _extract_json(response_text)
+    if parsed is not None:
+        return parsed
 
+    # Fallback structure if parsing fails
+    return {
+        "suggestions": ["Could not parse response as JSON."],
+        "optimized_resume": response_text
+    }
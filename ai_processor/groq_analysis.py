@@ -1,9 +1,15 @@
+# ai_processor/groq_analysis.py
 import os
 import json
+import time
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 
+from utils.http_client import post_json
+from ai_processor.prompt_builder import fit_prompt
+
 # Load environment variables
 load_dotenv()
 
@@ -11,6 +17,15 @@ load_dotenv()
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+AI_CALL_TIMEOUT = float(os.environ.get("AI_CALL_TIMEOUT", "90"))
+GROQ_MODEL = "llama3-70b-8192"
+
+# Shared, bounded pool for the concurrent Groq calls of analyze_resume_with_ai
+_fanout_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("AI_FANOUT_WORKERS", "12")),
+    thread_name_prefix="groq-fanout"
+)
+
 def get_groq_api_key():
     """
     Get Groq API key from environment variables
@@ -35,7 +50,7 @@ def call_groq_api(prompt, system_prompt="You are a helpful resume optimization a
     - Intent-based similarity (not just keyword matching)
     """
     api_key = get_groq_api_key()
-    api_url = "https://api.groq.com/openai/v1/chat/completions"
+    api_url = f"{os.environ.get('GROQ_API_BASE', 'https://api.groq.com/openai/v1')}/chat/completions"
     
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -45,7 +60,7 @@ def call_groq_api(prompt, system_prompt="You are a helpful resume optimization a
     # Use LLaMA 3 70B (8192 context window) - Groq's most powerful model
     # for advanced semantic understanding and NLP capabilities
     data = {
-        "model": "llama3-70b-8192",
+        "model": GROQ_MODEL,
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt}
@@ -57,7 +72,7 @@ def call_groq_api(prompt, system_prompt="You are a helpful resume optimization a
     logger.info(f"API request to: {api_url}")
     
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        response = post_json("groq", api_url, headers=headers, json=data)
         response.raise_for_status()  # Raise exception for HTTP errors
         
         logger.info(f"API response status: {response.status_code}")
@@ -77,7 +92,7 @@ def call_groq_api(prompt, system_prompt="You are a helpful resume optimization a
         logger.error(f"API request failed: {str(e)}")
         raise ValueError(f"API request failed: {str(e)}")
 
-def calculate_semantic_matching_score(resume_text, job_description):
+def calculate_semantic_matching_score(resume_text, job_description, raise_errors=False):
     """
     Use Groq API to calculate a semantic matching score between resume and job description
     using advanced analysis techniques
@@ -85,7 +100,8 @@ def calculate_semantic_matching_score(resume_text, job_description):
     system_prompt = """You are an AI trained to evaluate how well a resume matches a job description.
 Your goal is to provide a detailed analysis with an overall percentage match score without any explanatory text about your methodology."""
     
-    prompt = f"""ANALYZE THE FOLLOWING RESUME AGAINST THIS JOB DESCRIPTION:
+    def build(resume_text, job_description):
+        return f"""ANALYZE THE FOLLOWING RESUME AGAINST THIS JOB DESCRIPTION:
 
 JOB DESCRIPTION:
 {job_description}
@@ -113,13 +129,17 @@ Important formatting instructions:
 - Focus solely on the resume and job description content"""
 
     try:
+        prompt = fit_prompt(build, resume_text, job_description, "groq", GROQ_MODEL, max_output_tokens=1000,
+                            system_prompt=system_prompt)
         result = call_groq_api(prompt, system_prompt=system_prompt, max_tokens=1000, temperature=0.2)
         return result
     except Exception as e:
         logger.error(f"Error calculating semantic matching score: {str(e)}")
+        if raise_errors:
+            raise
         return "Unable to calculate matching score at this time. Please try again later."
 
-def get_improvement_suggestions(resume_text, job_description):
+def get_improvement_suggestions(resume_text, job_description, raise_errors=False):
     """
     Use Groq API to get improvement suggestions with advanced NLP techniques
     based on modern ATS compliance standards and semantic alignment
@@ -127,7 +147,8 @@ def get_improvement_suggestions(resume_text, job_description):
     system_prompt = """You are an expert resume optimization assistant with advanced NLP capabilities.
 Your job is to provide specific, actionable suggestions to improve a resume's match score, without any introductory text or explanations about your methodology."""
 
-    prompt = f"""ANALYZE THE FOLLOWING RESUME AGAINST THIS JOB DESCRIPTION:
+    def build(resume_text, job_description):
+        return f"""ANALYZE THE FOLLOWING RESUME AGAINST THIS JOB DESCRIPTION:
 
 JOB DESCRIPTION:
 {job_description}
@@ -160,13 +181,17 @@ AFTER: [improved text]
 [and so on...]"""
 
     try:
+        prompt = fit_prompt(build, resume_text, job_description, "groq", GROQ_MODEL, max_output_tokens=1200,
+                            system_prompt=system_prompt)
         suggestions = call_groq_api(prompt, system_prompt=system_prompt, max_tokens=1200, temperature=0.3)
         return suggestions
     except Exception as e:
         logger.error(f"Error getting improvement suggestions: {str(e)}")
+        if raise_errors:
+            raise
         return "Unable to generate suggestions at this time. Please try again later."
 
-def rewrite_resume(resume_text, job_description):
+def rewrite_resume(resume_text, job_description, raise_errors=False):
     """
     Use Groq API to rewrite the resume with advanced NLP techniques
     while preserving the original layout and adding strategic enhancements
@@ -174,7 +199,8 @@ def rewrite_resume(resume_text, job_description):
     system_prompt = """You are an expert resume optimization AI focused on strategic improvements that boost ATS scores.
 Your task is to enhance the resume while maintaining its core structure and making targeted optimizations."""
     
-    prompt = f"""CAREFULLY ENHANCE THIS RESUME TO BETTER MATCH THIS JOB DESCRIPTION:
+    def build(resume_text, job_description):
+        return f"""CAREFULLY ENHANCE THIS RESUME TO BETTER MATCH THIS JOB DESCRIPTION:
 
 JOB DESCRIPTION:
 {job_description}
@@ -212,8 +238,55 @@ The goal is to create a more optimized resume that:
 Provide JUST the enhanced resume with no introduction or conclusion text."""
 
     try:
+        prompt = fit_prompt(build, resume_text, job_description, "groq", GROQ_MODEL, max_output_tokens=2000,
+                            system_prompt=system_prompt)
         rewritten_resume = call_groq_api(prompt, system_prompt=system_prompt, max_tokens=2000, temperature=0.2)
         return rewritten_resume
     except Exception as e:
         logger.error(f"Error rewriting resume: {str(e)}")
+        if raise_errors:
+            raise
         return "Unable to rewrite resume at this time. Please try again later."
+
+def analyze_resume_with_ai(resume_text, job_description, timeout=None):
+    """
+    Run the match analysis, improvement suggestions and resume rewrite
+    concurrently, so the total latency is that of the slowest call rather
+    than the sum of all three.
+
+    Each call gets `timeout` seconds (AI_CALL_TIMEOUT by default). A call that
+    fails or times out leaves its entry as None and records the reason under
+    "errors"; the other results are still returned.
+    """
+    timeout = AI_CALL_TIMEOUT if timeout is None else timeout
+    calls = {
+        "match_analysis": calculate_semantic_matching_score,
+        "suggestions": get_improvement_suggestions,
+        "rewritten_resume": rewrite_resume,
+    }
+
+    start = time.perf_counter()
+    futures = {
+        _fanout_executor.submit(func, resume_text, job_description, raise_errors=True): name
+        for name, func in calls.items()
+    }
+    done, not_done = wait(futures, timeout=timeout)
+
+    results = {name: None for name in calls}
+    errors = {}
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = str(e)
+    for future in not_done:
+        # A running request cannot be interrupted; it finishes in the pool and is discarded
+        future.cancel()
+        errors[futures[future]] = f"Timed out after {timeout:g}s"
+
+    if errors:
+        logger.warning(f"AI analysis partially failed: {errors}")
+    logger.info(f"AI analysis finished in {time.perf_counter() - start:.2f}s")
+    results["errors"] = errors
+    return results
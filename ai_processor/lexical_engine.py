@@ -0,0 +1,82 @@
+# ai_processor/lexical_engine.py
+import os
+import re
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:  # optional: dense NumPy fallback below
+    sparse = None
+
+BM25_K1 = float(os.environ.get("LEXICAL_BM25_K1", "1.5"))
+BM25_B = float(os.environ.get("LEXICAL_BM25_B", "0.75"))
+
+# Words, plus the punctuation that matters in skill names (c++, c#, node.js, ci/cd)
+_token_pattern = re.compile(r"[a-z0-9][a-z0-9+#./-]*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the this to was we were "
+    "will with you your they their who what which while into over about than then also etc".split()
+)
+
+def tokenize(text):
+    """Lower-cased terms of text, without stopwords or trailing punctuation"""
+    terms = (token.rstrip("./-") for token in _token_pattern.findall(text.lower()))
+    return [term for term in terms if term and term not in STOPWORDS]
+
+def _term_counts(token_lists, vocabulary):
+    """(n_documents, len(vocabulary)) term counts, sparse CSR when SciPy is available"""
+    rows, cols = [], []
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            col = vocabulary.get(token)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    shape = (len(token_lists), len(vocabulary))
+    if sparse is not None:
+        data = np.ones(len(rows), dtype=np.float32)
+        return sparse.csr_matrix((data, (rows, cols)), shape=shape)  # duplicates are summed
+    counts = np.zeros(shape, dtype=np.float32)
+    np.add.at(counts, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1.0)
+    return counts
+
+def bm25_matrix(documents, queries, k1=None, b=None):
+    """
+    BM25 score of every document against every query, normalised to [0, 1]
+    by each query's best attainable score. Returns (n_documents, n_queries).
+
+    The vocabulary is learned from the queries, since only query terms can
+    contribute; document frequencies come from the documents. Weighting and
+    scoring are vectorised; with SciPy the document-term matrix stays sparse.
+    """
+    k1 = BM25_K1 if k1 is None else k1
+    b = BM25_B if b is None else b
+    document_tokens = [tokenize(text) for text in documents]
+    query_tokens = [tokenize(text) for text in queries]
+    vocabulary = {term: i for i, term in enumerate(sorted(set().union(*query_tokens)))}
+    if not vocabulary or not documents:
+        return np.zeros((len(documents), len(queries)), dtype=np.float32)
+
+    counts = _term_counts(document_tokens, vocabulary)
+    n_documents = len(documents)
+    lengths = np.array([len(tokens) for tokens in document_tokens], dtype=np.float32)
+    length_norm = k1 * (1 - b + b * lengths / max(float(lengths.mean()), 1.0))
+
+    if sparse is not None:
+        document_frequency = np.diff(counts.tocsc().indptr)
+        term_frequency = counts.data
+        row_of = np.repeat(np.arange(n_documents), np.diff(counts.indptr))
+        idf = np.log1p((n_documents - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        weights = counts.copy()
+        weights.data = term_frequency * (k1 + 1) / (term_frequency + length_norm[row_of]) * idf[counts.indices]
+    else:
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = np.log1p((n_documents - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        weights = counts * (k1 + 1) / (counts + length_norm[:, None]) * idf
+
+    # Queries as binary term indicators: each query term counts once
+    query_matrix = (_term_counts(query_tokens, vocabulary) > 0).astype(np.float32)
+    best = np.asarray(query_matrix @ (idf * (k1 + 1))).ravel()
+    scores = np.asarray((weights @ query_matrix.T).todense() if sparse is not None else weights @ query_matrix.T)
+    return (scores / np.where(best > 0, best, 1.0)).astype(np.float32)
@@ -0,0 +1,200 @@
+# ai_processor/prompt_builder.py
+import os
+import re
+import logging
+
+from ai_processor.resume_parser import parse_resume
+from ai_processor.ai_router import DEFAULT_MODELS
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional: character/word heuristic below
+    _encoding = None
+
+logger = logging.getLogger(__name__)
+
+# Context window (prompt + completion tokens) per model
+MODEL_CONTEXT_TOKENS = {
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "mixtral": 32768,
+    "mixtral-8x7b-32768": 32768,
+    "togethercomputer/Command-R+": 128000,
+    "openai/gpt-4-turbo": 128000,
+    "mistralai/Mistral-7B-Instruct-v0.1": 8192,
+}
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("PROMPT_DEFAULT_CONTEXT_TOKENS", "8192"))
+# Headroom for estimation error and chat-template tokens
+SAFETY_TOKENS = int(os.environ.get("PROMPT_SAFETY_TOKENS", "256"))
+# Most of the budget goes to the resume; the JD gets at most this share unless it needs less
+JD_BUDGET_SHARE = float(os.environ.get("PROMPT_JD_BUDGET_SHARE", "0.35"))
+
+# Resume sections in the order they are kept when the budget is tight
+SECTION_PRIORITY = ["header", "summary", "objective", "skills", "experience", "projects", "education",
+                    "certifications", "languages"]
+
+# JD paragraphs that cost tokens without saying anything about the role
+_boilerplate = re.compile(
+    r"equal (?:employment )?opportunity|without regard to|reasonable accommodation|"
+    r"affirmative action|e-verify|protected veteran|sexual orientation|gender identity|"
+    r"401\s*\(?k\)?|paid time off|\bPTO\b|health,? dental|dental,? (?:and )?vision|medical,? dental|"
+    r"benefits (?:package|include)|perks|wellness program|tuition reimbursement|"
+    r"privacy (?:policy|notice)|apply (?:now|today)|to apply,|click apply",
+    re.IGNORECASE
+)
+_boilerplate_heading = re.compile(
+    r"^\W*(?:benefits|perks|what we offer|why (?:join|work)|about (?:us|the company)|who we are|"
+    r"eeo|equal opportunity|diversity|compensation|salary|how to apply)\b[^.]{0,40}$",
+    re.IGNORECASE
+)
+_jd_heading = re.compile(
+    r"^\W*(?:requirements|qualifications|responsibilities|what you(?:'ll)? (?:do|bring|need)|"
+    r"must have|nice to have|skills|experience|about (?:the )?(?:role|job|position))\b[^.]{0,40}$",
+    re.IGNORECASE
+)
+
+def context_window(provider, model=None):
+    """Context size for provider/model; for "auto", the smallest one the router may fail over to"""
+    if provider == "auto":
+        return min(MODEL_CONTEXT_TOKENS.get(m, DEFAULT_CONTEXT_TOKENS) for m in DEFAULT_MODELS.values())
+    model = model or DEFAULT_MODELS.get(provider)
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+
+def estimate_tokens(text):
+    """Token count from tiktoken when installed, else a conservative characters/words estimate"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(len(text) // 4, int(len(text.split()) * 1.3)) + 1
+
+def normalize_whitespace(text):
+    """Trim lines, collapse runs of spaces/tabs and of blank lines"""
+    lines = [re.sub(r"[ \t ]+", " ", line).strip() for line in text.replace("\r\n", "\n").split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+def dedupe_lines(text):
+    """Drop non-empty lines that exactly repeat the line before them (e.g. pasted twice)"""
+    kept = []
+    for line in text.split("\n"):
+        if line and kept and line == kept[-1]:
+            continue
+        kept.append(line)
+    return "\n".join(kept)
+
+def _is_heading(line):
+    """A short line without sentence punctuation, e.g. "The Role" or "What you'll do:" """
+    text = line.strip().rstrip(":").strip()
+    return (bool(text) and text[0].isalpha() and len(text) <= 60 and len(text.split()) <= 6
+            and not re.search(r"[.!?,;]$", text))
+
+def strip_boilerplate(job_description):
+    """
+    Remove EEO statements, benefits and similar paragraphs from a job
+    description. A boilerplate heading ("Benefits", "About us", ...) drops
+    the lines under it up to the next heading; lines under a role heading
+    ("Requirements", "Responsibilities", ...) are always kept.
+    """
+    kept = []
+    skipping = False
+    in_role_section = False
+    for index, line in enumerate(job_description.split("\n")):
+        # The first line is usually the job title, e.g. "Benefits Administrator"
+        if index > 0 and _boilerplate_heading.match(line):
+            skipping = True
+            in_role_section = False
+            continue
+        if _is_heading(line):
+            skipping = False
+            in_role_section = bool(_jd_heading.match(line))
+        if skipping or (not in_role_section and _boilerplate.search(line)):
+            continue
+        kept.append(line)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+def _truncate_lines(text, budget):
+    """The longest prefix of whole lines (or words, for a single long line) within budget tokens"""
+    kept = []
+    used = 0
+    for line in text.split("\n"):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            if not kept:
+                words = line.split()
+                while words and estimate_tokens(" ".join(words)) > budget:
+                    words = words[:max(1, len(words) * 3 // 4)] if len(words) > 1 else []
+                kept.append(" ".join(words))
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+def _fit_blocks(blocks, budget):
+    """
+    Keep (priority, text) blocks, best priority first, until the budget is
+    spent; the first block that does not fit is cut to the remaining budget.
+    Output keeps the original block order.
+    """
+    costs = [estimate_tokens(text) + 1 for _, text in blocks]
+    kept = {}
+    remaining = budget
+    for index in sorted(range(len(blocks)), key=lambda i: (blocks[i][0], i)):
+        if costs[index] <= remaining:
+            kept[index] = blocks[index][1]
+            remaining -= costs[index]
+        elif remaining > 16:
+            kept[index] = _truncate_lines(blocks[index][1], remaining)
+            remaining = 0
+    return "\n\n".join(kept[i] for i in sorted(kept) if kept[i].strip())
+
+def compact_resume(resume_text, budget):
+    """
+    Normalised resume text, dropping low-priority sections if over budget.
+    Repeated lines are kept: the same title or bullet under two employers is
+    real content.
+    """
+    text = normalize_whitespace(resume_text)
+    if estimate_tokens(text) <= budget:
+        return text
+    blocks = []
+    for index, section in enumerate(parse_resume(text).sections):
+        kind = section.kind
+        priority = SECTION_PRIORITY.index(kind) if kind in SECTION_PRIORITY else len(SECTION_PRIORITY)
+        # The text before the first heading (name, contact details) is always kept first
+        blocks.append((-1 if index == 0 else priority, section.text()))
+    return _fit_blocks(blocks, budget)
+
+def compact_job_description(job_description, budget=None):
+    """
+    Normalised JD without boilerplate or adjacent duplicate lines; if it is
+    still over budget, requirement paragraphs are kept first.
+    """
+    text = normalize_whitespace(job_description)
+    text = dedupe_lines(strip_boilerplate(text) or text)
+    if budget is None or estimate_tokens(text) <= budget:
+        return text
+    blocks = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        first_line = paragraph.split("\n", 1)[0]
+        blocks.append((0 if _jd_heading.match(first_line) else 1, paragraph))
+    return _fit_blocks(blocks, budget) or _truncate_lines(text, budget)
+
+def fit_prompt(build, resume_text, job_description, provider, model=None, max_output_tokens=1500, system_prompt=""):
+    """
+    Build a prompt with build(resume_text, job_description), compacting both
+    inputs so prompt + completion fit the model's context window. The JD gets
+    at most JD_BUDGET_SHARE of the input budget; the resume gets the rest.
+    """
+    original_tokens = estimate_tokens(build(resume_text, job_description))
+    overhead = estimate_tokens(build("", "")) + estimate_tokens(system_prompt)
+    budget = context_window(provider, model) - max_output_tokens - overhead - SAFETY_TOKENS
+    budget = max(budget, 256)
+
+    job_description = compact_job_description(job_description, int(budget * JD_BUDGET_SHARE))
+    resume = compact_resume(resume_text, budget - estimate_tokens(job_description))
+
+    prompt = build(resume, job_description)
+    logger.info(f"Prompt compacted for {provider}/{model or 'default'}: "
+                f"~{original_tokens} -> ~{estimate_tokens(prompt)} tokens")
+    return prompt
@@ -0,0 +1,141 @@
+# ai_processor/resume_formatter.py
+import threading
+from io import BytesIO
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+
+# Paragraph styles: font, size, extra space before, line-height multiple after the last line
+STYLES = {
+    "heading": ("Helvetica-Bold", 14, 5, 2.0),
+    "skill_category": ("Helvetica-Bold", 11, 0, 1.5),
+    "title": ("Helvetica-Oblique", 11, 0, 1.5),
+    "body": ("Helvetica", 11, 0, 1.3),
+}
+
+_width_tables = {}
+_width_lock = threading.Lock()
+
+class GlyphWidths:
+    """
+    Advance widths of one font at 1pt, filled in per character on first use.
+    Standard PDF fonts have no kerning, so a string's width is the sum of its
+    glyph widths, the same figure canvas.stringWidth computes.
+    """
+
+    def __init__(self, font_name):
+        self.font_name = font_name
+        self._widths = {}
+
+    def char_width(self, char):
+        width = self._widths.get(char)
+        if width is None:
+            width = self._widths[char] = pdfmetrics.stringWidth(char, self.font_name, 1000) / 1000.0
+        return width
+
+    def string_width(self, text, font_size):
+        widths = self._widths
+        total = 0.0
+        for char in text:
+            width = widths.get(char)
+            total += width if width is not None else self.char_width(char)
+        return total * font_size
+
+def glyph_widths(font_name):
+    """The shared width table for font_name"""
+    table = _width_tables.get(font_name)
+    if table is None:
+        with _width_lock:
+            table = _width_tables.setdefault(font_name, GlyphWidths(font_name))
+    return table
+
+def wrap_words(text, font_name, font_size, max_width):
+    """
+    Greedy word wrap. Each word is measured once and line widths are
+    accumulated, so wrapping is linear in the paragraph length.
+    """
+    widths = glyph_widths(font_name)
+    space = widths.char_width(" ") * font_size
+    lines = []
+    line = []
+    line_width = 0.0
+    for word in text.split():
+        word_width = widths.string_width(word, font_size)
+        if line and line_width + space + word_width > max_width:
+            lines.append(" ".join(line))
+            line = [word]
+            line_width = word_width
+        else:
+            line_width += (space if line else 0.0) + word_width
+            line.append(word)
+    if line:
+        lines.append(" ".join(line))
+    return lines
+
+class PDFLayout:
+    """
+    Lays out styled paragraphs top to bottom on letter pages, starting a new
+    page whenever the next line would cross the bottom margin. A heading is
+    never left alone at the bottom of a page.
+    """
+
+    def __init__(self, pagesize=letter, margin=50, line_height=14):
+        self.width, self.height = pagesize
+        self.margin = margin
+        self.line_height = line_height
+        self.usable_width = self.width - 2 * margin
+        self.output = BytesIO()
+        self.canvas = canvas.Canvas(self.output, pagesize=pagesize)
+        self.y = self.height - margin
+        self._font = None
+
+    def _set_font(self, font_name, font_size):
+        if self._font != (font_name, font_size):
+            self.canvas.setFont(font_name, font_size)
+            self._font = (font_name, font_size)
+
+    def new_page(self):
+        self.canvas.showPage()
+        self._font = None  # showPage() resets the graphics state
+        self.y = self.height - self.margin
+
+    def _ensure_room(self, lines):
+        if self.y - (lines - 1) * self.line_height < self.margin:
+            self.new_page()
+
+    def add_space(self, amount):
+        self.y -= amount
+
+    def add_paragraph(self, text, style="body"):
+        font_name, font_size, space_before, space_after = STYLES[style]
+        lines = wrap_words(text, font_name, font_size, self.usable_width)
+        if not lines:
+            return
+        self.y -= space_before
+        # Keep a heading together with the first line that follows it
+        self._ensure_room(2 if style == "heading" else 1)
+        for index, line in enumerate(lines):
+            if index:
+                self.y -= self.line_height
+                self._ensure_room(1)
+            self._set_font(font_name, font_size)
+            self.canvas.drawString(self.margin, self.y, line)
+        self.y -= self.line_height * space_after
+
+    def save(self):
+        self.canvas.save()
+        return self.output
+
+def render_pdf(paragraphs, **layout_options):
+    """
+    Render (style, text) paragraphs to a PDF and return it as a BytesIO.
+    An empty text adds half a line of vertical space.
+    """
+    layout = PDFLayout(**layout_options)
+    for style, text in paragraphs:
+        if text.strip():
+            layout.add_paragraph(text, style)
+        else:
+            layout.add_space(layout.line_height / 2)
+    return layout.save()
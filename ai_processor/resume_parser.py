@@ -0,0 +1,192 @@
+# ai_processor/resume_parser.py
+import os
+import re
+import hashlib
+
+from utils.cache import LRUCache
+
+DEFAULT_HEADINGS = [
+    "SUMMARY", "PROFESSIONAL SUMMARY", "OBJECTIVE", "PROFILE",
+    "EXPERIENCE", "WORK EXPERIENCE", "PROFESSIONAL EXPERIENCE", "EMPLOYMENT HISTORY",
+    "EDUCATION", "PROJECTS", "SKILLS", "TECHNICAL SKILLS",
+    "CERTIFICATIONS", "CERTIFICATIONS & WORKSHOPS", "AWARDS", "ACHIEVEMENTS",
+    "PUBLICATIONS", "VOLUNTEERING", "EXTRACURRICULARS", "LANGUAGES", "INTERESTS",
+]
+
+DEFAULT_SKILL_CATEGORIES = [
+    "Programming Languages", "Languages", "Frameworks", "Libraries", "Databases",
+    "Tools", "Tools & Technologies", "Technologies", "Cloud", "Platforms", "Soft Skills",
+]
+
+SECTION_KINDS = ("experience", "employment", "education", "projects", "skills", "summary", "objective",
+                 "certifications", "volunteering", "extracurriculars", "languages")
+
+# Sections whose non-bullet lines introduce an entry (a role, degree or project)
+ENTRY_SECTIONS = {"experience", "education", "projects", "volunteering", "extracurriculars"}
+
+# Extra headings / skill labels, comma separated, on top of the defaults
+EXTRA_HEADINGS = [h.strip() for h in os.environ.get("RESUME_HEADINGS", "").split(",") if h.strip()]
+EXTRA_SKILL_CATEGORIES = [c.strip() for c in os.environ.get("RESUME_SKILL_CATEGORIES", "").split(",") if c.strip()]
+
+# Paragraph style used by the renderers for each item kind
+RENDER_STYLES = {
+    "heading": "heading",
+    "skill_category": "skill_category",
+    "entry": "title",
+    "bullet": "body",
+    "text": "body",
+    "blank": "body",
+}
+
+class Item:
+    """One line of a resume: kind is heading, skill_category, entry, bullet, text or blank"""
+
+    __slots__ = ("kind", "text")
+
+    def __init__(self, kind, text):
+        self.kind = kind
+        self.text = text
+
+    def __repr__(self):
+        return f"Item({self.kind!r}, {self.text!r})"
+
+class Section:
+    """A heading and the items under it. Text before the first heading is the "header" section."""
+
+    def __init__(self, title=None, kind="header"):
+        self.title = title
+        self.kind = kind
+        self.items = []
+
+    def text(self):
+        """The section's non-blank lines, heading included"""
+        lines = [self.title] if self.title else []
+        lines.extend(item.text for item in self.items if item.kind != "blank")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"Section({self.kind!r}, {self.title!r}, {len(self.items)} items)"
+
+class ResumeDocument:
+    """The section tree of one resume"""
+
+    def __init__(self, sections):
+        self.sections = sections
+
+    def section(self, kind):
+        """The first section of the given kind (e.g. "skills"), or None"""
+        return next((section for section in self.sections if section.kind == kind), None)
+
+    def paragraphs(self):
+        """(render style, text) for every line in document order"""
+        for section in self.sections:
+            if section.title is not None:
+                yield RENDER_STYLES["heading"], section.title
+            for item in section.items:
+                yield RENDER_STYLES[item.kind], item.text
+
+class ResumeParser:
+    """
+    Splits resume text into sections in one pass over its lines. Every line is
+    classified by a single compiled regex that matches headings, bullets and
+    "Label: ..." skill lines at once.
+
+    Headings come from the heading vocabulary. Other short all-caps lines
+    are headings only if they name a known section ("WORK HISTORY AND
+    EXPERIENCE"), or follow a blank line outside an entry section; never as
+    the first line, which is usually the name. All-caps names, job titles
+    and employers therefore stay in their section.
+    """
+
+    def __init__(self, headings=None, skill_categories=None):
+        headings = headings or DEFAULT_HEADINGS + EXTRA_HEADINGS
+        skill_categories = skill_categories or DEFAULT_SKILL_CATEGORIES + EXTRA_SKILL_CATEGORIES
+        # Longest first so "WORK EXPERIENCE" wins over "EXPERIENCE"
+        heading_alternatives = "|".join(re.escape(h) for h in sorted(headings, key=len, reverse=True))
+        self._skill_labels = {c.lower() for c in skill_categories}
+        self._pattern = re.compile(
+            r"^\s*(?:"
+            r"(?P<bullet>(?:[-*•▪–·]|\d+[.)])\s+\S)"
+            r"|[#*_]*\s*(?:"
+            rf"(?:(?P<heading>(?i:{heading_alternatives}))|(?P<caps>(?=[A-Z&/ ]{{5,}}\W*$)[A-Z][A-Z&/]*(?: [A-Z&/]+){{0,3}}))"
+            r"\s*[#*_:]*\s*$"
+            r"|(?P<label>[A-Za-z][^:]{0,38}?)[*_]*:\s*\S"
+            r"))"
+        )
+
+    @staticmethod
+    def _section_kind(title):
+        words = title.lower().split()
+        for kind in SECTION_KINDS:
+            if kind in words:
+                return "experience" if kind == "employment" else kind
+        return " ".join(words)
+
+    def _is_caps_heading(self, title, section, blank_before, seen_text):
+        if not seen_text:
+            return False
+        if self._section_kind(title) in SECTION_KINDS:
+            return True
+        return blank_before and section.kind not in ENTRY_SECTIONS
+
+    def parse(self, text):
+        sections = [Section()]
+        section = sections[0]
+        previous = None
+        blank_before = True
+        seen_text = False
+        for line in text.split("\n"):
+            if not line.strip():
+                section.items.append(Item("blank", line))
+                previous = None
+                blank_before = True
+                continue
+
+            match = self._pattern.match(line)
+            group = match.lastgroup if match else None
+            if group == "caps" and not self._is_caps_heading(line.strip(" #*_:"), section, blank_before, seen_text):
+                group = None
+            blank_before = False
+            seen_text = True
+            if group in ("heading", "caps"):
+                title = line.strip()
+                section = Section(title, self._section_kind(title.strip("#*_: ")))
+                sections.append(section)
+                previous = None
+                continue
+
+            if group == "bullet":
+                item = Item("bullet", line)
+                # A plain line directly above a bullet list is the entry it describes
+                if (previous is not None and previous.kind == "text" and section.kind in ENTRY_SECTIONS
+                        and not previous.text[:1].isspace()):
+                    previous.kind = "entry"
+            elif group == "label" and (section.kind == "skills"
+                                       or match.group("label").strip(" *_").lower() in self._skill_labels):
+                item = Item("skill_category", line)
+            elif section.kind in ENTRY_SECTIONS and (previous is None or (previous.kind == "bullet"
+                                                                          and not line[:1].isspace())):
+                item = Item("entry", line)
+            else:
+                item = Item("text", line)
+            section.items.append(item)
+            previous = item
+
+        if not sections[0].items and len(sections) > 1:
+            sections.pop(0)
+        return ResumeDocument(sections)
+
+default_parser = ResumeParser()
+_parse_cache = LRUCache(maxsize=int(os.environ.get("RESUME_PARSE_CACHE_SIZE", "256")))
+
+def parse_resume(text):
+    """
+    The section tree for text, parsed once and then served from a cache so
+    the renderers and the scorer share it. Treat the result as read-only.
+    """
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    document = _parse_cache.get(key)
+    if document is None:
+        document = default_parser.parse(text)
+        _parse_cache.put(key, document)
+    return document
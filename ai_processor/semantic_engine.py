@@ -0,0 +1,296 @@
+# ai_processor/semantic_engine.py
+import os
+import json
+import tempfile
+import threading
+import numpy as np
+
+from utils.cache import thread_connection
+
+INDEX_PATH = os.environ.get("SEMANTIC_INDEX_PATH", os.path.join(tempfile.gettempdir(), "ats_index", "index"))
+SEARCH_BLOCK_ROWS = int(os.environ.get("SEMANTIC_INDEX_BLOCK_ROWS", "16384"))
+
+class VectorIndex:
+    """
+    Persistent embedding index for job descriptions and resumes.
+
+    Vectors are L2-normalised float16 rows in a memory-mapped file (<path>.f16),
+    so workers share the OS page cache instead of each loading the corpus into
+    RAM. A SQLite sidecar (<path>.sqlite) maps rows to document ids, kinds and
+    metadata. Deletes are tombstones; re-adding an id tombstones the old row.
+    Queries scan the matrix block by block, or only the probed lists once
+    build_ivf() has partitioned the corpus.
+    """
+
+    def __init__(self, path=INDEX_PATH, dim=None):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._vectors_path = f"{path}.f16"
+        self._centroids_path = f"{path}.centroids.npy"
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._version = None
+        self._vectors = None
+        self._live = np.zeros(0, dtype=bool)
+        self._kinds = np.zeros(0, dtype=object)
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._centroids = None
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "row INTEGER PRIMARY KEY, doc_id TEXT NOT NULL, kind TEXT NOT NULL, "
+                "metadata TEXT, deleted INTEGER NOT NULL DEFAULT 0, list_id INTEGER NOT NULL DEFAULT -1)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_doc_id ON documents (kind, doc_id, deleted)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', '0')")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('count', '0')")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('capacity', '0')")
+            if dim is not None:
+                conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+
+    def _connect(self):
+        return thread_connection(self._local, f"{self.path}.sqlite", timeout=30.0)
+
+    def _meta(self, conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _bump_version(self, conn):
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'")
+
+    @property
+    def dim(self):
+        value = self._meta(self._connect(), "dim")
+        return int(value) if value is not None else None
+
+    def __len__(self):
+        self._refresh()
+        return int(self._live.sum())
+
+    def _grow(self, conn, needed, dim):
+        """Extend the vector file to hold at least `needed` rows (capacity doubles)"""
+        capacity = int(self._meta(conn, "capacity", 0))
+        if needed <= capacity:
+            return
+        new_capacity = max(1024, capacity * 2)
+        while new_capacity < needed:
+            new_capacity *= 2
+        with open(self._vectors_path, "ab") as fh:
+            fh.truncate(new_capacity * dim * 2)
+        self._set_meta(conn, "capacity", new_capacity)
+
+    def _open_vectors(self, capacity, dim):
+        if capacity == 0:
+            return None
+        return np.memmap(self._vectors_path, dtype=np.float16, mode="r+", shape=(capacity, dim))
+
+    def _refresh(self):
+        """Reload the row tables (and remap the file) if another writer changed the index"""
+        conn = self._connect()
+        if self._meta(conn, "version") == self._version:
+            return
+        with self._lock:
+            # One read transaction, so the row count and the rows come from the
+            # same snapshot even if another process adds documents meanwhile
+            conn.execute("BEGIN")
+            try:
+                version = self._meta(conn, "version")
+                count = int(self._meta(conn, "count", 0))
+                capacity = int(self._meta(conn, "capacity", 0))
+                dim = self._meta(conn, "dim")
+                documents = conn.execute("SELECT row, kind, deleted, list_id FROM documents").fetchall()
+            finally:
+                conn.commit()
+            live = np.zeros(count, dtype=bool)
+            kinds = np.empty(count, dtype=object)
+            lists = np.full(count, -1, dtype=np.int32)
+            for row, kind, deleted, list_id in documents:
+                live[row] = not deleted
+                kinds[row] = kind
+                lists[row] = list_id
+            self._vectors = self._open_vectors(capacity, int(dim)) if dim else None
+            self._live, self._kinds, self._lists = live, kinds, lists
+            self._centroids = np.load(self._centroids_path) if os.path.exists(self._centroids_path) else None
+            self._version = version
+
+    def add(self, doc_ids, vectors, kind="job", metadata=None):
+        """
+        Append documents. vectors is (n, dim); metadata an optional list of
+        JSON-serialisable dicts. Existing documents with the same id and kind
+        are replaced.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(doc_ids):
+            raise ValueError("vectors must be an (n, dim) array with one row per id")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        metadata = metadata or [None] * len(doc_ids)
+
+        self._refresh()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            dim = self.dim
+            if dim is None:
+                dim = vectors.shape[1]
+                self._set_meta(conn, "dim", dim)
+            elif dim != vectors.shape[1]:
+                raise ValueError(f"Index dimension is {dim}, got vectors of dimension {vectors.shape[1]}")
+
+            start = int(self._meta(conn, "count", 0))
+            self._grow(conn, start + len(doc_ids), dim)
+            capacity = int(self._meta(conn, "capacity"))
+            mapped = self._open_vectors(capacity, dim)
+            mapped[start:start + len(doc_ids)] = vectors.astype(np.float16)
+            mapped.flush()
+
+            lists = self._assign_lists(vectors)
+            placeholders = ",".join("?" * len(doc_ids))
+            conn.execute(
+                f"UPDATE documents SET deleted = 1 WHERE kind = ? AND deleted = 0 AND doc_id IN ({placeholders})",
+                [kind] + [str(doc_id) for doc_id in doc_ids]
+            )
+            conn.executemany(
+                "INSERT INTO documents (row, doc_id, kind, metadata, list_id) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (start + i, str(doc_id), kind, json.dumps(meta) if meta is not None else None, int(lists[i]))
+                    for i, (doc_id, meta) in enumerate(zip(doc_ids, metadata))
+                ]
+            )
+            self._set_meta(conn, "count", start + len(doc_ids))
+            self._bump_version(conn)
+        return list(range(start, start + len(doc_ids)))
+
+    def delete(self, doc_ids, kind="job"):
+        """Tombstone documents; returns how many rows were removed"""
+        if not doc_ids:
+            return 0
+        conn = self._connect()
+        placeholders = ",".join("?" * len(doc_ids))
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE documents SET deleted = 1 WHERE kind = ? AND deleted = 0 AND doc_id IN ({placeholders})",
+                [kind] + [str(doc_id) for doc_id in doc_ids]
+            )
+            if cursor.rowcount:
+                self._bump_version(conn)
+        return cursor.rowcount
+
+    def _assign_lists(self, vectors):
+        if self._centroids is None:
+            return np.full(len(vectors), -1, dtype=np.int32)
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def build_ivf(self, n_lists=None, iterations=10, sample_size=50000, seed=0):
+        """
+        Partition live vectors into n_lists clusters (spherical k-means on a
+        sample), so search() only scans the lists nearest to each query.
+        Worth it from roughly 50k documents up.
+        """
+        self._refresh()
+        rows = np.flatnonzero(self._live)
+        if len(rows) == 0:
+            return 0
+        n_lists = n_lists or max(1, int(np.sqrt(len(rows))))
+        n_lists = min(n_lists, len(rows))
+        rng = np.random.default_rng(seed)
+
+        sample = np.sort(rng.choice(rows, size=min(sample_size, len(rows)), replace=False))
+        data = np.asarray(self._vectors[sample], dtype=np.float32)
+        centroids = data[rng.choice(len(data), size=n_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            counts = np.bincount(assignment, minlength=n_lists)
+            empty = counts == 0
+            sums[empty] = centroids[empty]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+        assignments = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            block = np.asarray(self._vectors[rows[start:start + SEARCH_BLOCK_ROWS]], dtype=np.float32)
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        tmp_path = f"{self._centroids_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, centroids.astype(np.float32))
+        os.replace(tmp_path, self._centroids_path)
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "UPDATE documents SET list_id = ? WHERE row = ?",
+                [(int(list_id), int(row)) for row, list_id in zip(rows, assignments)]
+            )
+            self._bump_version(conn)
+        return n_lists
+
+    def search(self, query, k=10, kind="job", nprobe=None):
+        """
+        Top-k cosine matches for a query vector among live documents of `kind`.
+        Returns [{"id", "score", "metadata"}, ...] in descending score order.
+        """
+        self._refresh()
+        if self._vectors is None or k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        mask = self._live if kind is None else (self._live & (self._kinds == kind))
+        if self._centroids is not None and nprobe != 0:
+            nprobe = nprobe or int(os.environ.get("SEMANTIC_INDEX_NPROBE", "8"))
+            probes = np.argsort(-(self._centroids @ query))[:nprobe]
+            mask = mask & np.isin(self._lists, probes)
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return []
+
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            block_rows = rows[start:start + SEARCH_BLOCK_ROWS]
+            if block_rows[-1] - block_rows[0] + 1 == len(block_rows):
+                block = self._vectors[block_rows[0]:block_rows[-1] + 1]
+            else:
+                block = self._vectors[block_rows]
+            scores = np.asarray(block, dtype=np.float32) @ query
+            best_rows = np.concatenate([best_rows, block_rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+
+        order = np.argsort(-best_scores)
+        best_rows, best_scores = best_rows[order], best_scores[order]
+        placeholders = ",".join("?" * len(best_rows))
+        details = {
+            row: (doc_id, metadata)
+            for row, doc_id, metadata in self._connect().execute(
+                f"SELECT row, doc_id, metadata FROM documents WHERE row IN ({placeholders})",
+                [int(row) for row in best_rows]
+            )
+        }
+        return [
+            {
+                "id": details[int(row)][0],
+                "score": float(score),
+                "metadata": json.loads(details[int(row)][1]) if details[int(row)][1] else None,
+            }
+            for row, score in zip(best_rows, best_scores)
+        ]
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """Process-wide index at SEMANTIC_INDEX_PATH, opened on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex(INDEX_PATH)
+    return _index
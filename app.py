@@ -1,14 +1,23 @@
 import os
 import io
+import json
+import time
 import uuid
 import tempfile
 import logging
-from flask import Flask, request, render_template, flash, redirect, url_for, session, send_file
+from flask import Flask, Request, request, render_template, flash, redirect, url_for, session, send_file, jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
 
-from document_processor import extract_text, calculate_ats_score, create_pdf, create_docx
-from resume_optimizer import generate_resume_feedback
+from document_processor import (extract_text, calculate_ats_score, is_model_ready, warmup,
+                                embedding_cache, batcher, tiered_score_matrix, top_k_matches, embed_documents, extraction_stats,
+                                render_document, render_cache, prerender_documents, section_coverage,
+                                submit_background)
+from ai_processor.semantic_engine import get_index
+from ai_processor.ai_router import response_cache, router
+from resume_optimizer import generate_resume_feedback, stream_resume_feedback
+from job_queue import jobs, QueueFull
 
 # Load environment variables
 load_dotenv()
@@ -21,11 +30,29 @@ fh.setLevel(logging.DEBUG)
 fh.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
 logger.addHandler(fh)
 
+# Uploads larger than MAX_UPLOAD_BYTES are rejected with 413 before they are read;
+# those under UPLOAD_SPOOL_BYTES never touch the disk
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.environ.get("UPLOAD_SPOOL_BYTES", str(2 * 1024 * 1024)))
+
+class SpooledRequest(Request):
+    """Buffer uploaded files in memory up to UPLOAD_SPOOL_BYTES, then spill to a temp file"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES, mode='rb+')
+
 # Flask app
 app = Flask(__name__)
+app.request_class = SpooledRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
 app.secret_key = os.environ.get("SESSION_SECRET", "default-secret-key-for-development")
 ALLOWED_EXTENSIONS = {'pdf', 'docx'}
-TEMP_FOLDER = tempfile.gettempdir()
+BULK_MAX_DOCUMENTS = int(os.environ.get("BULK_MAX_DOCUMENTS", "5000"))
+# "auto" lets the router pick the fastest healthy provider; AI_MODEL only applies to a fixed provider
+AI_PROVIDER = os.environ.get("AI_PROVIDER", "auto")
+AI_MODEL = os.environ.get("AI_MODEL") or None
+# Minimum seconds between progress updates a streaming job writes to the job store
+JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", "0.5"))
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -34,8 +61,103 @@ def allowed_file(filename):
 def index():
     return render_template('index.html')
 
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once the ATS scoring model is loaded, 503 before that.
+    Pass ?warmup=1 to trigger loading from the probe itself."""
+    if not is_model_ready() and request.args.get('warmup') == '1':
+        try:
+            warmup()
+        except Exception as e:
+            logger.error(f"Model warmup failed: {str(e)}")
+    ready = is_model_ready()
+    return jsonify({'model_ready': ready}), (200 if ready else 503)
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Cache and queue counters for this worker process"""
+    return jsonify({
+        'extraction': extraction_stats(),
+        'render_cache': render_cache.stats(),
+        'embedding_cache': embedding_cache.stats(),
+        'embedding_batcher': batcher.stats(),
+        'llm_cache': response_cache.stats() if response_cache is not None else None,
+        'providers': router.stats(),
+        'jobs': jobs.stats()
+    })
+
+def run_analysis_pipeline(resume_bytes, filename, job_description, provider, model, use_cache=True, stream=False):
+    """
+    The /analyze pipeline (text extraction, LLM feedback, ATS scoring), run on
+    the background job pool. Returns everything the results page needs; the
+    rewritten resume kept in the job record is what /download renders.
+
+    With stream=True the completion is streamed from the provider, and the
+    initial score and the text so far are published as the job's progress.
+    """
+    resume_text = extract_text(resume_bytes, filename=filename)
+
+    if stream:
+        ai_output = None
+        fragments = []
+        last_report = 0.0
+        for kind, payload in stream_resume_feedback(resume_text, job_description, provider=provider, model=model,
+                                                    use_cache=use_cache):
+            if kind == 'score':
+                jobs.report_progress(score=int(payload * 100))
+            elif kind == 'token':
+                fragments.append(payload)
+                if time.monotonic() - last_report >= JOB_PROGRESS_INTERVAL:
+                    jobs.report_progress(text=''.join(fragments))
+                    last_report = time.monotonic()
+            else:
+                ai_output = payload
+        # The last fragments may have arrived within JOB_PROGRESS_INTERVAL of the previous report
+        if fragments:
+            jobs.report_progress(text=''.join(fragments))
+    else:
+        ai_output = generate_resume_feedback(resume_text, job_description, provider=provider, model=model,
+                                             use_cache=use_cache)
+
+    match_analysis = f"MATCH SCORE: {int(ai_output['ats_score'] * 100)}%"
+    suggestions = "\n".join(ai_output['suggestions'])
+    rewritten_resume = ai_output['optimized_resume']
+
+    initial_score = ai_output['ats_score']
+    initial_score_normalized = int(initial_score * 100)
+
+    # Rescore the rewrite while the downloads render and the coverage is computed.
+    # The JD's chunk embeddings are cached from the initial score, so only the
+    # rewritten resume goes through the model, batched with the coverage texts.
+    new_score_future = submit_background(calculate_ats_score, rewritten_resume, job_description) \
+        if rewritten_resume.strip() else None
+    prerender_documents(rewritten_resume)
+    coverage = section_coverage(resume_text, job_description)
+
+    new_score = new_score_future.result() if new_score_future is not None else initial_score
+    new_score_normalized = int(new_score * 100)
+
+    return {
+        'section_coverage': coverage,
+        'initial_score': initial_score_normalized,
+        'new_score': new_score_normalized,
+        'suggestions': suggestions,
+        'rewritten_resume': rewritten_resume,
+        'resume_text': resume_text,
+        'job_description': job_description,
+        'match_analysis': match_analysis
+    }
+
+def _wants_json():
+    return request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html
+
 @app.route('/analyze', methods=['POST'])
 def analyze_resume():
+    """
+    Validate the upload and queue the analysis as a background job.
+    API clients (Accept: application/json) get 202 with the job id; browsers
+    are redirected to the results page, which waits for the job to finish.
+    """
     try:
         session_id = str(uuid.uuid4())
         session['session_id'] = session_id
@@ -57,98 +179,305 @@ def analyze_resume():
 
         if resume_file and allowed_file(resume_file.filename):
             filename = secure_filename(resume_file.filename)
-            file_path = os.path.join(TEMP_FOLDER, f"{session_id}_{filename}")
-            resume_file.save(file_path)
-            session['resume_path'] = file_path
+            resume_bytes = resume_file.read()
             session['original_filename'] = filename
 
+            # no_cache=1 asks for a fresh completion instead of a cached one
+            use_cache = request.form.get('no_cache') != '1'
             try:
-                resume_text = extract_text(file_path)
-
-                # Provider/model logic (can be dynamic later)
-                provider = "groq"  # or "together", "huggingface", "openrouter"
-                model = "mixtral"  # or "gemma", "llama2-70b", etc.
-
-                ai_output = generate_resume_feedback(resume_text, job_description, provider=provider, model=model)
-
-                match_analysis = f"MATCH SCORE: {int(ai_output['ats_score'] * 100)}%"
-                suggestions = "\n".join(ai_output['suggestions'])
-                rewritten_resume = ai_output['optimized_resume']
-
-                initial_score = ai_output['ats_score']
-                initial_score_normalized = int(initial_score * 100)
-
-                new_score = initial_score  # Could be recalculated from rewritten_resume
-                new_score_normalized = initial_score_normalized
-
-                # Store rewritten resume in temp file
-                rewritten_resume_path = os.path.join(TEMP_FOLDER, f"{session_id}_rewritten_resume.txt")
-                with open(rewritten_resume_path, 'w') as f:
-                    f.write(rewritten_resume)
-
-                session['rewritten_resume_path'] = rewritten_resume_path
-                session['initial_score'] = initial_score_normalized
-                session['new_score'] = new_score_normalized
-
-                return render_template('index.html',
-                                       initial_score=initial_score_normalized,
-                                       new_score=new_score_normalized,
-                                       suggestions=suggestions,
-                                       rewritten_resume=rewritten_resume,
-                                       resume_text=resume_text,
-                                       job_description=job_description,
-                                       match_analysis=match_analysis,
-                                       has_detailed_analysis=True,
-                                       analysis_complete=True)
-
-            except Exception as e:
-                logger.error(f"Error processing resume: {str(e)}")
-                flash(f"Error processing resume: {str(e)}")
+                # stream=1 (sent by the page's script) publishes the LLM output as job progress
+                job_id = jobs.submit(run_analysis_pipeline, resume_bytes, filename, job_description,
+                                     AI_PROVIDER, AI_MODEL, use_cache=use_cache,
+                                     stream=request.form.get('stream') == '1')
+            except QueueFull as e:
+                logger.warning(f"Analysis queue full: {str(e)}")
+                if _wants_json():
+                    return jsonify({'error': 'The server is busy. Please try again in a moment.'}), 503
+                flash('The server is busy. Please try again in a moment.')
                 return redirect(url_for('index'))
 
+            session['job_id'] = job_id
+
+            if _wants_json():
+                return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+            return redirect(url_for('job_result', job_id=job_id))
+
         else:
             flash('File type not allowed. Please upload a PDF or DOCX file.')
             return redirect(url_for('index'))
 
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
         flash(f'An unexpected error occurred: {str(e)}')
         return redirect(url_for('index'))
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status of an analysis job, with its result once it is done"""
+    record = jobs.get(job_id)
+    if record is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(record)
+
+@app.route('/results/<job_id>', methods=['GET'])
+def job_result(job_id):
+    """Results page for a job; while it is still running the page polls /jobs/<id>"""
+    record = jobs.get(job_id)
+    if record is None:
+        flash('Analysis not found or expired. Please try analyzing your resume again.')
+        return redirect(url_for('index'))
+
+    if record['status'] in ('queued', 'running'):
+        return render_template('index.html', pending_job_id=job_id)
+
+    if record['status'] == 'failed':
+        flash(f"Error processing resume: {record.get('error')}")
+        return redirect(url_for('index'))
+
+    result = record['result']
+    session['job_id'] = job_id
+    session['initial_score'] = result['initial_score']
+    session['new_score'] = result['new_score']
+
+    return render_template('index.html',
+                           has_detailed_analysis=True,
+                           analysis_complete=True,
+                           **result)
+
+def _sse(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_resume_stream():
+    """
+    Server-sent events variant of /analyze. The analysis runs as a background
+    job like any other; this response relays its progress: a "score" event
+    with the local ATS score, "token" events while the LLM writes, then
+    "done" with the result (or "error"). Downloads work afterwards exactly
+    as after /analyze. The browser form polls /jobs/<id> instead, so it does
+    not hold a worker for the whole analysis.
+    """
+    resume_file = request.files.get('resume')
+    job_description = request.form.get('job_description', '')
+    if not resume_file or resume_file.filename == '':
+        return jsonify({'error': 'No resume file selected'}), 400
+    if not job_description:
+        return jsonify({'error': 'Job description is required'}), 400
+    if not allowed_file(resume_file.filename):
+        return jsonify({'error': 'File type not allowed. Please upload a PDF or DOCX file.'}), 400
+
+    filename = secure_filename(resume_file.filename)
+    use_cache = request.form.get('no_cache') != '1'
+    try:
+        job_id = jobs.submit(run_analysis_pipeline, resume_file.read(), filename, job_description,
+                             AI_PROVIDER, AI_MODEL, use_cache=use_cache, stream=True)
+    except QueueFull as e:
+        logger.warning(f"Analysis queue full: {str(e)}")
+        return jsonify({'error': 'The server is busy. Please try again in a moment.'}), 503
+
+    # The session cookie goes out with the response headers, before any event,
+    # so everything the download route needs is decided up front
+    session['session_id'] = str(uuid.uuid4())
+    session['original_filename'] = filename
+    session['job_id'] = job_id
+
+    def generate():
+        score_sent = False
+        text_sent = 0
+        while True:
+            record = jobs.get(job_id)
+            if record is None:
+                yield _sse('error', {'message': 'Analysis not found or expired.'})
+                return
+            progress = record.get('progress', {})
+            if not score_sent and 'score' in progress:
+                yield _sse('score', {'score': progress['score']})
+                score_sent = True
+            text = progress.get('text', '')
+            if len(text) > text_sent:
+                yield _sse('token', {'text': text[text_sent:]})
+                text_sent = len(text)
+
+            if record['status'] == 'failed':
+                yield _sse('error', {'message': f"Error processing resume: {record.get('error')}"})
+                return
+            if record['status'] == 'done':
+                result = record['result']
+                if not score_sent:
+                    yield _sse('score', {'score': result['initial_score']})
+                yield _sse('done', {
+                    'initial_score': result['initial_score'],
+                    'new_score': result['new_score'],
+                    'suggestions': result['suggestions'].split('\n') if result['suggestions'] else [],
+                    'rewritten_resume': result['rewritten_resume']
+                })
+                return
+            time.sleep(JOB_PROGRESS_INTERVAL)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+@app.route('/score/sections', methods=['POST'])
+def score_sections():
+    """
+    Per-section / per-requirement similarity of a resume to a job description.
+    Body: {"resume_text": ..., "job_description": ..., "threshold": 0.5}
+    """
+    payload = request.get_json(silent=True) or {}
+    resume_text = payload.get('resume_text')
+    job_description = payload.get('job_description')
+    if not isinstance(resume_text, str) or not resume_text.strip():
+        return jsonify({'error': "'resume_text' is required"}), 400
+    if not isinstance(job_description, str) or not job_description.strip():
+        return jsonify({'error': "'job_description' is required"}), 400
+    try:
+        threshold = payload.get('threshold')
+        threshold = None if threshold is None else float(threshold)
+    except (TypeError, ValueError):
+        return jsonify({'error': "'threshold' must be a number"}), 400
+
+    return jsonify(section_coverage(resume_text, job_description, threshold=threshold))
+
+def _bulk_documents(items, kind):
+    """Accept either plain strings or {"id": ..., "text": ...} objects"""
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"'{kind}' must be a non-empty list")
+    ids, texts = [], []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            ids.append(index)
+            texts.append(item)
+        elif isinstance(item, dict) and isinstance(item.get('text'), str):
+            ids.append(item.get('id', index))
+            texts.append(item['text'])
+        else:
+            raise ValueError(f"'{kind}[{index}]' must be a string or an object with a 'text' field")
+    return ids, texts
+
+@app.route('/bulk/score', methods=['POST'])
+def bulk_score():
+    """
+    Rank many resumes against many job descriptions.
+    Body: {"resumes": [...], "job_descriptions": [...], "top_k": 5, "by": "role" | "candidate",
+           "tier": "semantic" | "lexical" | "hybrid", "shortlist": 50}
+    Streams one JSON object per role (or per candidate) as JSON Lines. "lexical"
+    skips the transformer; "hybrid" only embeds each role's BM25 shortlist.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        resume_ids, resume_texts = _bulk_documents(payload.get('resumes'), 'resumes')
+        jd_ids, jd_texts = _bulk_documents(payload.get('job_descriptions'), 'job_descriptions')
+        top_k = int(payload.get('top_k', 5))
+        by = payload.get('by', 'role')
+        if by not in ('role', 'candidate'):
+            raise ValueError("'by' must be 'role' or 'candidate'")
+        tier = payload.get('tier')
+        if tier not in (None, 'semantic', 'lexical', 'hybrid'):
+            raise ValueError("'tier' must be 'semantic', 'lexical' or 'hybrid'")
+        shortlist = payload.get('shortlist')
+        shortlist = None if shortlist is None else max(int(shortlist), top_k)
+        if len(resume_texts) + len(jd_texts) > BULK_MAX_DOCUMENTS:
+            raise ValueError(f"At most {BULK_MAX_DOCUMENTS} documents per request")
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    matrix = tiered_score_matrix(resume_texts, jd_texts, tier=tier, shortlist=shortlist)
+
+    if by == 'role':
+        row_ids, row_key, match_ids, match_key = jd_ids, 'job_id', resume_ids, 'resume_id'
+    else:
+        row_ids, row_key, match_ids, match_key = resume_ids, 'resume_id', jd_ids, 'job_id'
+
+    def generate():
+        for index, matches in top_k_matches(matrix, k=top_k, by=by):
+            yield json.dumps({
+                row_key: row_ids[index],
+                'matches': [{match_key: match_ids[other], 'score': round(score, 4)} for other, score in matches]
+            }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+INDEX_KINDS = ('job', 'resume')
+
+@app.route('/index/<kind>', methods=['POST'])
+def index_documents(kind):
+    """
+    Add job descriptions or resumes to the persistent semantic index.
+    Body: {"documents": [{"id": ..., "text": ..., any other fields kept as metadata}]}
+    """
+    if kind not in INDEX_KINDS:
+        return jsonify({'error': f"Unknown index kind: {kind}"}), 404
+    documents = (request.get_json(silent=True) or {}).get('documents')
+    if not isinstance(documents, list) or not documents or not all(
+            isinstance(d, dict) and 'id' in d and isinstance(d.get('text'), str) for d in documents):
+        return jsonify({'error': "'documents' must be a non-empty list of {id, text} objects"}), 400
+
+    vectors = embed_documents([d['text'] for d in documents])
+    metadata = [{k: v for k, v in d.items() if k not in ('id', 'text')} or None for d in documents]
+    get_index().add([d['id'] for d in documents], vectors, kind=kind, metadata=metadata)
+    return jsonify({'indexed': len(documents)})
+
+@app.route('/index/<kind>/<doc_id>', methods=['DELETE'])
+def delete_indexed_document(kind, doc_id):
+    if kind not in INDEX_KINDS:
+        return jsonify({'error': f"Unknown index kind: {kind}"}), 404
+    removed = get_index().delete([doc_id], kind=kind)
+    return jsonify({'deleted': removed}), (200 if removed else 404)
+
+@app.route('/index/match', methods=['POST'])
+def match_indexed_documents():
+    """
+    Find the best indexed documents for a text, e.g. the best roles for a resume.
+    Body: {"text": ..., "kind": "job", "top_k": 10}
+    """
+    payload = request.get_json(silent=True) or {}
+    text = payload.get('text')
+    kind = payload.get('kind', 'job')
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({'error': "'text' is required"}), 400
+    if kind not in INDEX_KINDS:
+        return jsonify({'error': f"Unknown index kind: {kind}"}), 400
+    try:
+        top_k = int(payload.get('top_k', 10))
+    except (TypeError, ValueError):
+        return jsonify({'error': "'top_k' must be an integer"}), 400
+
+    query = embed_documents([text])[0]
+    return jsonify({'matches': get_index().search(query, k=top_k, kind=kind)})
+
 @app.route('/download/<format>', methods=['GET'])
 def download_resume(format):
     try:
-        if 'rewritten_resume_path' not in session:
+        if 'job_id' not in session:
             flash('No resume data available. Please analyze a resume first.')
             return redirect(url_for('index'))
 
-        rewritten_resume_path = session.get('rewritten_resume_path')
-        if not rewritten_resume_path or not os.path.exists(rewritten_resume_path):
+        record = jobs.get(session['job_id'])
+        if record is None or record['status'] != 'done':
             flash('Resume content is missing or expired. Please try analyzing your resume again.')
             return redirect(url_for('index'))
 
-        with open(rewritten_resume_path, 'r') as f:
-            rewritten_resume = f.read()
+        rewritten_resume = record['result']['rewritten_resume']
 
         original_filename = session.get('original_filename', 'resume')
         base_filename = original_filename.rsplit('.', 1)[0]
 
         if format == 'docx':
-            output = create_docx(rewritten_resume)
             mimetype = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            filename = f"{base_filename}_rewritten.docx"
         elif format == 'pdf':
-            output = create_pdf(rewritten_resume)
             mimetype = 'application/pdf'
-            filename = f"{base_filename}_rewritten.pdf"
         else:
             flash('Invalid format specified')
             return redirect(url_for('index'))
+        filename = f"{base_filename}_rewritten.{format}"
 
-        file_obj = io.BytesIO(output.getvalue())
-        file_obj.seek(0)
-
-        return send_file(file_obj, mimetype=mimetype, as_attachment=True, download_name=filename)
+        # Usually pre-rendered when the analysis finished. BytesIO over a bytes
+        # object shares its buffer, so the cached document is not copied
+        data = render_document(rewritten_resume, format)
+        return send_file(io.BytesIO(data), mimetype=mimetype, as_attachment=True, download_name=filename)
 
     except Exception as e:
         logger.error(f"Error generating downloadable file: {str(e)}")
@@ -0,0 +1,162 @@
+# benchmarks/bench_document_processor.py
+"""
+Offline micro-benchmarks for the document_processor hot paths.
+
+    python -m benchmarks.bench_document_processor --output bench.json
+    python -m benchmarks.bench_document_processor --compare bench.json
+
+Times extract_text (PDF / DOCX, cold and cached), calculate_ats_score (cold
+and cached), create_docx and create_pdf over a generated corpus, and writes
+throughput, latency percentiles and peak RSS (for the whole run and, where
+the kernel can reset the high-water mark, per benchmark) as JSON. With
+--compare, the run is checked against an earlier result file and exits
+non-zero if any benchmark's p50 regressed by more than --threshold.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import document_processor
+from ai_processor import resume_parser
+from document_processor import extract_text, calculate_ats_score, create_docx, create_pdf, warmup
+from benchmarks.corpus import build_corpus
+from benchmarks.stats import latency_summary, peak_rss_mb, reset_peak_rss
+
+def clear_caches():
+    """Forget everything the processor has memoised, so the next call does the full work"""
+    document_processor.extraction_cache.clear()
+    document_processor.embedding_cache.clear()
+    document_processor._chunk_cache.clear()
+    document_processor.render_cache.clear()
+    resume_parser._parse_cache.clear()
+
+def measure(func, inputs, iterations, cold=True):
+    """
+    Call func on every input `iterations` times; returns latency stats in
+    milliseconds and the peak RSS while doing so (None if the high-water mark
+    cannot be reset, as it would then include every earlier benchmark).
+    """
+    own_peak = reset_peak_rss()
+    timings = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for args in inputs:
+            if cold:
+                clear_caches()
+            began = time.perf_counter()
+            func(*args)
+            timings.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "calls": len(timings),
+        "throughput_per_s": round(len(timings) / elapsed, 2),
+        **{k: v for k, v in latency_summary(timings).items() if k != "count"},
+        "peak_rss_mb": peak_rss_mb() if own_peak else None,
+    }
+
+def run(corpus, iterations):
+    resumes = corpus["resumes"]
+    jds = corpus["job_descriptions"]
+    results = {}
+
+    def bench(name, func, inputs, cold=True):
+        # Untimed calls so imports, pools and the model load outside the measurement;
+        # for the cached variants, every input is primed
+        for args in (inputs if not cold else inputs[:1]):
+            func(*args)
+        results[name] = measure(func, inputs, iterations, cold=cold)
+        print(f"{name:40s} p50 {results[name]['p50_ms']:9.3f} ms   p99 {results[name]['p99_ms']:9.3f} ms",
+              file=sys.stderr)
+
+    for size in ("short", "medium", "long"):
+        sized = [r for r in resumes if r["size"] == size]
+        pairs = [(r["text"], jds[i % len(jds)]["text"]) for i, r in enumerate(sized)]
+        for extension in ("pdf", "docx"):
+            bench(f"extract_text/{extension}/{size}", extract_text, [(r[extension],) for r in sized])
+        bench(f"calculate_ats_score/{size}", calculate_ats_score, pairs)
+        bench(f"create_docx/{size}", create_docx, [(r["text"],) for r in sized])
+        bench(f"create_pdf/{size}", create_pdf, [(r["text"],) for r in sized])
+
+    everything = [(r["pdf"],) for r in resumes] + [(r["docx"],) for r in resumes]
+    bench("extract_text/cached", extract_text, everything, cold=False)
+    pairs = [(r["text"], jds[i % len(jds)]["text"]) for i, r in enumerate(resumes)]
+    bench("calculate_ats_score/cached", calculate_ats_score, pairs, cold=False)
+    return results
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline, threshold):
+    """Names of benchmarks whose p50 is more than `threshold` (a fraction) slower than baseline"""
+    regressions = []
+    for name, stats in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before and before["p50_ms"] > 0 and stats["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p50 {before['p50_ms']:.3f} -> {stats['p50_ms']:.3f} ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p50 slowdown (default 0.2 = 20%%)")
+    parser.add_argument("--iterations", type=int, default=5, help="passes over each input set")
+    parser.add_argument("--per-size", type=int, default=5, help="resumes per size class")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-dir", help="where to write the generated PDF/DOCX files (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    warmup()
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = build_corpus(args.corpus_dir or tmp, seed=args.seed, per_size=args.per_size)
+        # Taken before the benchmarks reset the high-water mark
+        setup_peak = peak_rss_mb()
+        results = run(corpus, args.iterations)
+    peaks = [setup_peak, peak_rss_mb()] + [r["peak_rss_mb"] for r in results.values() if r["peak_rss_mb"]]
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": document_processor.MODEL_NAME,
+            "embedding_backend": document_processor.EMBEDDING_BACKEND,
+            "score_mode": document_processor.SCORE_MODE,
+            "pdf_sandbox": document_processor.PDF_SANDBOX,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "per_size": args.per_size,
+        },
+        "results": results,
+        "peak_rss_mb": max(peaks),
+    }
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(report, json.load(fh), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# benchmarks/corpus.py
+"""
+Deterministic synthetic resumes and job descriptions for the benchmarks.
+The same seed always produces the same texts, so runs on different commits
+measure the same inputs.
+"""
+import os
+import random
+
+from document_processor import create_docx, create_pdf
+
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie"]
+LAST_NAMES = ["Nguyen", "Garcia", "Smith", "Okafor", "Kowalski", "Haddad", "Tanaka", "Silva"]
+ROLES = ["Backend Engineer", "Data Scientist", "Frontend Developer", "DevOps Engineer", "ML Engineer",
+         "Product Analyst", "Site Reliability Engineer", "Full Stack Developer"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Tech", "Hooli"]
+SKILLS = ["Python", "Go", "Java", "TypeScript", "React", "Node.js", "Kubernetes", "Docker", "AWS", "GCP",
+          "PostgreSQL", "Kafka", "Spark", "Terraform", "PyTorch", "scikit-learn", "Airflow", "GraphQL",
+          "Redis", "CI/CD", "Linux", "SQL", "Flask", "Django"]
+VERBS = ["Built", "Designed", "Led", "Migrated", "Optimised", "Automated", "Shipped", "Scaled", "Reduced",
+         "Introduced", "Refactored", "Mentored"]
+OBJECTS = ["a billing service", "the data platform", "CI pipelines", "a recommendation model",
+           "the public API", "observability dashboards", "an event-driven ingestion layer",
+           "the customer onboarding flow", "a feature store", "infrastructure as code"]
+OUTCOMES = ["cutting p95 latency by {n}%", "saving ${n}k per year", "serving {n}M requests per day",
+            "improving conversion by {n}%", "reducing incidents by {n}%", "for {n} internal teams"]
+
+# Resume sizes: (roles, bullets per role, projects)
+SIZES = {"short": (1, 3, 1), "medium": (3, 5, 2), "long": (8, 8, 6)}
+
+def _bullet(rng):
+    outcome = rng.choice(OUTCOMES).format(n=rng.randint(5, 90))
+    return f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} with {rng.choice(SKILLS)} and {rng.choice(SKILLS)}, {outcome}"
+
+def make_resume(rng, size="medium"):
+    roles, bullets, projects = SIZES[size]
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [name, f"{name.lower().replace(' ', '.')}@example.com | +1 555 {rng.randint(1000, 9999)}", "",
+             "SUMMARY", f"{rng.choice(ROLES)} with {rng.randint(2, 15)} years of experience.", "",
+             "EXPERIENCE"]
+    year = 2025
+    for _ in range(roles):
+        start = year - rng.randint(1, 4)
+        lines.append(f"{rng.choice(ROLES)}, {rng.choice(COMPANIES)} | {start} - {year}")
+        lines.extend(_bullet(rng) for _ in range(bullets))
+        year = start
+    lines += ["", "PROJECTS"]
+    for index in range(projects):
+        lines.append(f"Project {index + 1}: {rng.choice(OBJECTS).capitalize()}")
+        lines.extend(_bullet(rng) for _ in range(2))
+    lines += ["", "SKILLS",
+              f"Programming Languages: {', '.join(rng.sample(SKILLS[:6], 3))}",
+              f"Tools & Technologies: {', '.join(rng.sample(SKILLS[6:], 6))}",
+              "", "EDUCATION", f"BSc Computer Science, State University | {year - 4} - {year}"]
+    return "\n".join(lines)
+
+def make_job_description(rng, requirements=8):
+    role = rng.choice(ROLES)
+    lines = [f"{role} at {rng.choice(COMPANIES)}", "", "Responsibilities"]
+    lines.extend(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)}" for _ in range(requirements // 2))
+    lines += ["", "Requirements"]
+    lines.extend(f"- {rng.randint(2, 8)}+ years with {rng.choice(SKILLS)} and {rng.choice(SKILLS)}"
+                 for _ in range(requirements))
+    lines += ["", "Benefits", "- 401(k) matching", "- Health, dental and vision",
+              "", "We are an equal opportunity employer."]
+    return "\n".join(lines)
+
+def build_corpus(directory, seed=0, per_size=5, job_descriptions=10):
+    """
+    Write resumes of every size as PDF and DOCX into directory and return
+    {"resumes": [{"size", "text", "pdf", "docx"}], "job_descriptions": [{"text", "pdf", "docx"}]}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    corpus = {"resumes": [], "job_descriptions": []}
+
+    def write(stem, text):
+        paths = {}
+        for extension, render in (("pdf", create_pdf), ("docx", create_docx)):
+            paths[extension] = os.path.join(directory, f"{stem}.{extension}")
+            with open(paths[extension], "wb") as fh:
+                fh.write(render(text).getvalue())
+        return paths
+
+    for size in SIZES:
+        for index in range(per_size):
+            text = make_resume(rng, size)
+            corpus["resumes"].append({"size": size, "text": text, **write(f"resume_{size}_{index}", text)})
+    for index in range(job_descriptions):
+        text = make_job_description(rng, requirements=rng.choice([4, 8, 16]))
+        corpus["job_descriptions"].append({"text": text, **write(f"jd_{index}", text)})
+    return corpus
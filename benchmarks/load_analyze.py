@@ -0,0 +1,181 @@
+# benchmarks/load_analyze.py
+"""
+End-to-end load driver for /analyze and /download/<format>.
+
+    python -m benchmarks.stub_provider --port 8600 &
+    GROQ_API_BASE=http://127.0.0.1:8600/v1 GROQ_API_KEY=stub ... gunicorn main:app &
+    python -m benchmarks.load_analyze --url http://127.0.0.1:5000 --concurrency 16 --duration 60
+
+Each virtual user uploads a synthetic resume to /analyze (as an API client,
+so it gets a job id back), polls /jobs/<id> until the job finishes, then
+downloads the PDF and DOCX. The report gives throughput, latency percentiles
+per phase and a breakdown of errors, as JSON.
+
+By default every journey sends a freshly generated resume and job
+description with no_cache=1, so no extraction, embedding, LLM or render
+cache can answer for the provider and the workers. --repeat-inputs N cycles
+through N fixed pairs instead and --allow-cache drops no_cache=1, to measure
+the warm-cache path.
+"""
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+
+import requests
+
+from benchmarks.corpus import make_job_description, make_resume, SIZES
+from benchmarks.stats import latency_summary
+from document_processor import create_docx
+
+class LoadRun:
+    """Latencies and error counts shared by the user threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {"submit": [], "analysis": [], "download_pdf": [], "download_docx": [], "end_to_end": []}
+        self.errors = Counter()
+        self.completed = 0
+
+    def record(self, phase, seconds):
+        with self._lock:
+            self.latencies[phase].append(seconds)
+
+    def error(self, kind):
+        with self._lock:
+            self.errors[kind] += 1
+
+    def done(self):
+        with self._lock:
+            self.completed += 1
+
+def one_session(base_url, upload, job_description, run, poll_interval, job_timeout, timeout, no_cache=True):
+    """
+    One user journey: analyze, wait for the job, download both formats.
+    /analyze stores the job id in the session cookie, which /download reads.
+    """
+    session = requests.Session()
+    began = time.perf_counter()
+    try:
+        response = session.post(f"{base_url}/analyze", headers={"Accept": "application/json"},
+                                files={"resume": ("resume.docx", upload)},
+                                data={"job_description": job_description, "no_cache": "1" if no_cache else "0"},
+                                timeout=timeout)
+        run.record("submit", time.perf_counter() - began)
+        if response.status_code != 202:
+            return run.error(f"analyze_http_{response.status_code}")
+
+        status_url = f"{base_url}{response.json()['status_url']}"
+        deadline = time.monotonic() + job_timeout
+        while True:
+            record = session.get(status_url, timeout=timeout).json()
+            if record.get("status") in ("done", "failed"):
+                break
+            if time.monotonic() > deadline:
+                return run.error("job_timeout")
+            time.sleep(poll_interval)
+        if record["status"] == "failed":
+            return run.error("job_failed")
+        run.record("analysis", time.perf_counter() - began)
+
+        for format in ("pdf", "docx"):
+            started = time.perf_counter()
+            response = session.get(f"{base_url}/download/{format}", timeout=timeout, allow_redirects=False)
+            if response.status_code != 200:
+                return run.error(f"download_{format}_http_{response.status_code}")
+            run.record(f"download_{format}", time.perf_counter() - started)
+    except requests.exceptions.Timeout:
+        return run.error("client_timeout")
+    except requests.exceptions.RequestException as e:
+        return run.error(type(e).__name__)
+
+    run.record("end_to_end", time.perf_counter() - began)
+    run.done()
+
+def make_inputs(seed, index):
+    """A resume (as DOCX bytes) and job description unique to this seed and journey index"""
+    rng = random.Random(f"{seed}:{index}")
+    size = list(SIZES)[index % len(SIZES)]
+    return create_docx(make_resume(rng, size)).getvalue(), make_job_description(rng)
+
+def drive(base_url, concurrency, duration=None, requests_total=None, seed=0, poll_interval=0.25,
+          job_timeout=300.0, timeout=60.0, repeat_inputs=None, no_cache=True):
+    """
+    Run `concurrency` users until `duration` seconds pass or `requests_total`
+    journeys started. Inputs are unique per journey unless repeat_inputs
+    gives the number of fixed pairs to cycle through.
+    """
+    corpus = [make_inputs(seed, index) for index in range(repeat_inputs)] if repeat_inputs else None
+
+    run = LoadRun()
+    started = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration if duration else None
+
+    def user():
+        while True:
+            with lock:
+                if (requests_total is not None and started[0] >= requests_total) or \
+                        (stop_at is not None and time.monotonic() >= stop_at):
+                    return
+                index = started[0]
+                started[0] += 1
+            upload, job_description = corpus[index % len(corpus)] if corpus else make_inputs(seed, index)
+            one_session(base_url, io.BytesIO(upload), job_description, run, poll_interval, job_timeout, timeout,
+                        no_cache=no_cache)
+
+    began = time.perf_counter()
+    threads = [threading.Thread(target=user, name=f"user-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    return {
+        "url": base_url,
+        "concurrency": concurrency,
+        "repeat_inputs": repeat_inputs,
+        "no_cache": no_cache,
+        "elapsed_s": round(elapsed, 2),
+        "started": started[0],
+        "completed": run.completed,
+        "throughput_per_s": round(run.completed / elapsed, 3) if elapsed else 0.0,
+        "error_rate": round(sum(run.errors.values()) / started[0], 4) if started[0] else 0.0,
+        "errors": dict(run.errors),
+        "latency": {phase: latency_summary(values) for phase, values in run.latencies.items()},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="base URL of the app")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, help="seconds to keep starting journeys")
+    parser.add_argument("--requests", type=int, help="number of journeys (default 50 without --duration)")
+    parser.add_argument("--job-timeout", type=float, default=300.0, help="give up polling a job after this")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat-inputs", type=int, metavar="N",
+                        help="cycle through N fixed resume/JD pairs instead of unique inputs per journey")
+    parser.add_argument("--allow-cache", action="store_true", help="do not send no_cache=1 with each analysis")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    requests_total = args.requests if args.requests or args.duration else 50
+    report = drive(args.url.rstrip("/"), args.concurrency, duration=args.duration, requests_total=requests_total,
+                   seed=args.seed, poll_interval=args.poll_interval, job_timeout=args.job_timeout,
+                   repeat_inputs=args.repeat_inputs, no_cache=not args.allow_cache)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output + "\n")
+    else:
+        print(output)
+    return 0 if report["completed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+# benchmarks/stats.py
+import sys
+import resource
+
+import numpy as np
+
+def reset_peak_rss():
+    """
+    Restart the RSS high-water mark that peak_rss_mb reports, so it covers
+    only what runs next. Linux only; returns False where it is unsupported.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        return False
+    return True
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def latency_summary(seconds):
+    """mean / p50 / p95 / p99 / max in milliseconds for a list of durations in seconds"""
+    if not len(seconds):
+        return {"count": 0}
+    timings = np.asarray(seconds, dtype=np.float64) * 1000
+    return {
+        "count": len(timings),
+        "mean_ms": round(float(timings.mean()), 3),
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "p99_ms": round(float(np.percentile(timings, 99)), 3),
+        "max_ms": round(float(timings.max()), 3),
+    }
@@ -0,0 +1,209 @@
+# benchmarks/stub_provider.py
+"""
+Local stand-in for the LLM providers used by ai_processor.ai_router, for
+load tests that must not spend real tokens.
+
+    python -m benchmarks.stub_provider --port 8600 --latency lognormal:800,0.5 \\
+        --error-rate 0.02 --rate-limit-rate 0.05
+
+Speaks the OpenAI chat-completions format (POST .../chat/completions, with
+"stream": true served as server-sent events) and the Hugging Face inference
+format (POST .../models/<model>). Point the app at it with:
+
+    GROQ_API_BASE=http://127.0.0.1:8600/v1 GROQ_API_KEY=stub
+    TOGETHER_API_BASE=http://127.0.0.1:8600/v1 TOGETHER_API_KEY=stub
+    OPENROUTER_API_BASE=http://127.0.0.1:8600/v1 OPENROUTER_API_KEY=stub
+    HUGGINGFACE_API_BASE=http://127.0.0.1:8600/models HUGGINGFACE_API_KEY=stub
+
+The reply is the JSON resume_optimizer asks for, with the resume from the
+prompt echoed back as the "optimized" version.
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Latency:
+    """
+    Response time distribution, parsed from "fixed:MS", "uniform:LOW_MS,HIGH_MS"
+    or "lognormal:MEDIAN_MS,SIGMA"
+    """
+
+    def __init__(self, spec):
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v]
+        if kind == "fixed" and len(values) == 1:
+            self._sample = lambda rng: values[0]
+        elif kind == "uniform" and len(values) == 2:
+            self._sample = lambda rng: rng.uniform(values[0], values[1])
+        elif kind == "lognormal" and len(values) == 2:
+            self._sample = lambda rng: values[0] * rng.lognormvariate(0.0, values[1])
+        else:
+            raise ValueError(f"Unsupported latency spec: {spec}")
+
+    def sample(self, rng):
+        return max(0.0, self._sample(rng)) / 1000.0
+
+_resume_in_prompt = re.compile(r"resume:\s*-{4}\n(.*?)\n-{4}", re.IGNORECASE | re.DOTALL)
+
+def fake_completion(prompt):
+    match = _resume_in_prompt.search(prompt)
+    resume = match.group(1) if match else "Experienced engineer."
+    return json.dumps({
+        "suggestions": [
+            "Quantify the impact of each role with metrics.",
+            "Move the skills that the job description asks for to the top of the skills section.",
+            "Mirror the job description's wording for the core requirements.",
+        ],
+        "optimized_resume": resume,
+    })
+
+class StubProvider:
+    """Shared configuration and counters for the request handlers"""
+
+    def __init__(self, latency, error_rate=0.0, rate_limit_rate=0.0, retry_after=1, tokens_per_second=200.0,
+                 seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.tokens_per_second = tokens_per_second
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "streamed": 0, "errors": 0, "rate_limited": 0}
+
+    def draw(self):
+        """(outcome, delay) for the next request: outcome is "ok", "error" or "rate_limited" """
+        with self._lock:
+            self.counts["requests"] += 1
+            roll = self._rng.random()
+            delay = self.latency.sample(self._rng)
+        if roll < self.rate_limit_rate:
+            return "rate_limited", 0.0
+        if roll < self.rate_limit_rate + self.error_rate:
+            return "error", delay
+        return "ok", delay
+
+    def count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+def make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with stub._lock:
+                    return self._send_json(200, dict(stub.counts))
+            self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send_json(400, {"error": "invalid JSON"})
+
+            outcome, delay = stub.draw()
+            if outcome == "rate_limited":
+                stub.count("rate_limited")
+                return self._send_json(429, {"error": {"message": "Rate limit exceeded"}},
+                                       headers={"Retry-After": str(stub.retry_after)})
+            time.sleep(delay)
+            if outcome == "error":
+                stub.count("errors")
+                return self._send_json(500, {"error": {"message": "Injected server error"}})
+
+            if self.path.rstrip("/").endswith("/chat/completions"):
+                prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+                text = fake_completion(prompt)
+                if body.get("stream"):
+                    return self._stream(body.get("model"), text)
+                stub.count("ok")
+                return self._send_json(200, {
+                    "id": "stub", "object": "chat.completion", "model": body.get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": text}}],
+                })
+            if "/models/" in self.path:
+                stub.count("ok")
+                return self._send_json(200, [{"generated_text": fake_completion(body.get("inputs", ""))}])
+            self._send_json(404, {"error": "not found"})
+
+        def _stream(self, model, text):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            # ~4 characters per token
+            pieces = [text[i:i + 16] for i in range(0, len(text), 16)]
+            pause = 4.0 / stub.tokens_per_second if stub.tokens_per_second > 0 else 0.0
+            for piece in pieces:
+                event = {"id": "stub", "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": piece}}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n")
+                time.sleep(pause)
+            self._chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            stub.count("streamed")
+
+        def _chunk(self, data):
+            data = data.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+def serve(host="127.0.0.1", port=8600, **options):
+    """Start the stub in a background thread; returns the server (call shutdown() to stop)"""
+    stub = StubProvider(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    server.stub = stub
+    threading.Thread(target=server.serve_forever, name="stub-provider", daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--latency", default="lognormal:800,0.5",
+                        help="fixed:MS | uniform:LOW_MS,HIGH_MS | lognormal:MEDIAN_MS,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="streaming speed")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    server = serve(args.host, args.port, latency=Latency(args.latency), error_rate=args.error_rate,
+                   rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                   tokens_per_second=args.tokens_per_second, seed=args.seed)
+    print(f"Stub provider listening on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(server.stub.counts), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
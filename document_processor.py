@@ -1,87 +1,595 @@
 import os
-import io
-from pdfminer.converter import TextConverter
-from pdfminer.pdfinterp import PDFPageInterpreter
-from pdfminer.pdfinterp import PDFResourceManager
-from pdfminer.pdfpage import PDFPage
+import re
+import time
+import queue
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import docx
 import numpy as np
 from io import BytesIO
 from docx import Document
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from transformers import AutoTokenizer, AutoModel
-import torch
-
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-_tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-_model = AutoModel.from_pretrained(MODEL_NAME)
-
-def pdf_extract_text(file_path):
-    """Extract text from a PDF file using pdfminer"""
-    resource_manager = PDFResourceManager()
-    fake_file_handle = io.StringIO()
-    converter = TextConverter(resource_manager, fake_file_handle)
-    page_interpreter = PDFPageInterpreter(resource_manager, converter)
-    
-    with open(file_path, 'rb') as fh:
-        for page in PDFPage.get_pages(fh, caching=True, check_extractable=True):
-            page_interpreter.process_page(page)
-            
-    text = fake_file_handle.getvalue()
-    
-    # Close resources
-    converter.close()
-    fake_file_handle.close()
-    
-    return text
 
-def extract_text(file_path):
+from pdf_extraction import extract_pdf_text, sandbox as pdf_sandbox, PDF_MAX_PAGES, PDF_MAX_CHARS
+from embedding_backends import OnnxBackend, TorchBackend, load_backend, tokenizer_lock
+from utils.cache import LRUCache, SQLiteStore
+from ai_processor.resume_formatter import render_pdf
+from ai_processor.resume_parser import parse_resume
+from ai_processor.lexical_engine import bm25_matrix
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = os.environ.get("ATS_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+# "torch" (fp32 reference) or "onnx" (ONNX Runtime, int8 quantized, falls back to torch)
+EMBEDDING_BACKEND = os.environ.get("ATS_EMBEDDING_BACKEND", "torch")
+
+# The backend (and torch/onnxruntime with it) is loaded on first use, or by
+# warmup() in the gunicorn master, never at import time.
+_backend_lock = threading.Lock()
+_backend = None
+
+def get_backend():
     """
-    Extract text from PDF or DOCX file
+    Return the embedding backend used for ATS scoring, loading it on first use
     """
-    file_extension = os.path.splitext(file_path)[1].lower()
-    
-    if file_extension == '.pdf':
-        return pdf_extract_text(file_path)
-    elif file_extension == '.docx':
-        doc = docx.Document(file_path)
-        text = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = load_backend(EMBEDDING_BACKEND, MODEL_NAME)
+    return _backend
+
+def is_model_ready():
+    """Whether the scoring model has been loaded in this process"""
+    return _backend is not None
+
+def warmup(run_inference=True):
+    """
+    Load the scoring model ahead of the first request.
+
+    Called with run_inference=False in the gunicorn master so that forked workers
+    share the weights copy-on-write, and with run_inference=True in each worker so
+    the first /analyze request does not pay for lazy initialisation either.
+    """
+    global _backend
+    if not run_inference and EMBEDDING_BACKEND == OnnxBackend.name:
+        # ONNX Runtime sessions own thread pools that do not survive fork, so the
+        # master only prepares the exported model file for the workers
+        try:
+            OnnxBackend(MODEL_NAME).export()
+            return
+        except Exception as e:
+            # Same fallback as load_backend: the workers would end up on torch anyway
+            logger.warning(f"ONNX export failed ({e}); preloading the torch backend instead")
+        with _backend_lock:
+            if _backend is None:
+                _backend = load_backend(TorchBackend.name, MODEL_NAME)
+        return
+    get_backend()
+    if run_inference:
+        calculate_ats_score("warmup", "warmup")
+
+# Run PDF parsing in the sandboxed helper pool (timeout + memory cap); 0 parses in-process
+PDF_SANDBOX = os.environ.get("PDF_EXTRACT_SANDBOX", "1") == "1"
+
+def pdf_extract_text(source, max_pages=None, max_chars=None):
+    """
+    Extract text from a PDF (path, bytes or binary file object) using pdfminer,
+    page by page, within the PDF_MAX_PAGES / PDF_MAX_CHARS budget. Unless
+    PDF_EXTRACT_SANDBOX=0 this runs in the sandboxed process pool with a
+    timeout and memory cap.
+    """
+    if PDF_SANDBOX:
+        return pdf_sandbox.extract(source, max_pages=max_pages, max_chars=max_chars)
+    return extract_pdf_text(source, max_pages=max_pages, max_chars=max_chars)
+
+def _read_source(source):
+    """The raw bytes of a path, bytes-like object or binary file object"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as fh:
+            return fh.read()
+    if hasattr(source, 'read'):
+        return source.read()
+    return bytes(source)
+
+def _make_extraction_cache():
+    store = None
+    cache_path = os.environ.get("ATS_EXTRACTION_CACHE_PATH")
+    if cache_path:
+        store = SQLiteStore(
+            cache_path,
+            table="extracted_text",
+            dumps=lambda text: text.encode("utf-8"),
+            loads=lambda blob: bytes(blob).decode("utf-8")
+        )
+    return LRUCache(maxsize=int(os.environ.get("ATS_EXTRACTION_CACHE_SIZE", "256")), store=store)
+
+# Extracted text keyed by a hash of the uploaded bytes, so a re-upload skips parsing
+extraction_cache = _make_extraction_cache()
+_extraction_lock = threading.Lock()
+_extraction_timings = {"count": 0, "seconds": 0.0, "max_seconds": 0.0}
+
+def _extraction_key(data, file_extension):
+    # The PDF budget is part of the key: changing it must not serve stale truncations
+    limits = f"{PDF_MAX_PAGES}:{PDF_MAX_CHARS}" if file_extension == '.pdf' else ""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{file_extension}:{limits}:{digest}"
+
+def extraction_stats():
+    """Extraction cache hit rate plus time spent actually parsing documents"""
+    with _extraction_lock:
+        timings = dict(_extraction_timings)
+    timings["mean_seconds"] = round(timings["seconds"] / timings["count"], 4) if timings["count"] else 0.0
+    timings["seconds"] = round(timings["seconds"], 4)
+    timings["max_seconds"] = round(timings["max_seconds"], 4)
+    return {"cache": extraction_cache.stats(), "parsing": timings}
+
+def extract_text(source, filename=None):
+    """
+    Extract text from a PDF or DOCX file. source is a path, bytes or a binary
+    file-like object; for the latter two, filename gives the format.
+    Results are cached by a hash of the file contents.
+    """
+    name = filename or (source if isinstance(source, (str, os.PathLike)) else '')
+    file_extension = os.path.splitext(name)[1].lower()
+    if file_extension not in ('.pdf', '.docx'):
+        raise ValueError(f"Unsupported file format: {file_extension}")
+
+    data = _read_source(source)
+    key = _extraction_key(data, file_extension)
+    text = extraction_cache.get(key)
+    if text is not None:
         return text
+
+    start = time.perf_counter()
+    if file_extension == '.pdf':
+        text = pdf_extract_text(data)
     else:
-        raise ValueError(f"Unsupported file format: {file_extension}")
+        doc = docx.Document(BytesIO(data))
+        text = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
+    elapsed = time.perf_counter() - start
+
+    with _extraction_lock:
+        _extraction_timings["count"] += 1
+        _extraction_timings["seconds"] += elapsed
+        _extraction_timings["max_seconds"] = max(_extraction_timings["max_seconds"], elapsed)
+    extraction_cache.put(key, text)
+    return text
     
-def mean_pooling(model_output, attention_mask):
-    token_embeddings = model_output[0]  # First element: token embeddings
-    input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-    return (token_embeddings * input_mask_expanded).sum(1) / input_mask_expanded.sum(1)
+def encode_texts(texts):
+    """
+    Run texts through the embedding backend in one padded batch.
+    Returns an (n, dim) float32 array of L2-normalised mean-pooled embeddings.
+    """
+    return get_backend().encode(texts)
+
+class EmbeddingBatcher:
+    """
+    Micro-batches embedding requests from concurrent callers.
+
+    Callers block on encode(); a single background thread drains the queue,
+    waiting at most max_wait_ms for more work once the first request arrives,
+    runs one padded forward pass per max_batch_size texts and hands each caller
+    its own rows. Under load requests also pile up while a batch is running, so
+    the next batch fills without waiting at all.
+    """
+
+    def __init__(self, encode_fn, max_batch_size=32, max_wait_ms=2.0):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.texts = 0
+
+    def _ensure_started(self):
+        # The worker thread does not survive a fork, so restart it per process
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def submit(self, texts):
+        """Queue texts for embedding and return a Future of their (n, dim) array"""
+        future = Future()
+        if not texts:
+            future.set_result(np.zeros((0, 0), dtype=np.float32))
+            return future
+        self._ensure_started()
+        self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts):
+        return self.submit(texts).result()
+
+    def _run(self):
+        requests_queue = self._queue
+        while True:
+            batch = [requests_queue.get()]
+            count = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while count < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = requests_queue.get(timeout=remaining)
+                    else:
+                        item = requests_queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                count += len(item[0])
+            self._process(batch)
+
+    def _process(self, batch):
+        texts = [text for item_texts, _ in batch for text in item_texts]
+        try:
+            # Sort by length so each forward pass pads as little as possible
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            vectors = [None] * len(texts)
+            for start in range(0, len(order), self.max_batch_size):
+                chunk = order[start:start + self.max_batch_size]
+                encoded = self.encode_fn([texts[i] for i in chunk])
+                for i, vector in zip(chunk, encoded):
+                    vectors[i] = vector
+                self.batches += 1
+            self.texts += len(texts)
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} texts failed: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for item_texts, future in batch:
+            future.set_result(np.vstack(vectors[offset:offset + len(item_texts)]))
+            offset += len(item_texts)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
 
-def calculate_ats_score(resume_text, job_description):
+batcher = EmbeddingBatcher(
+    encode_texts,
+    max_batch_size=int(os.environ.get("ATS_BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.environ.get("ATS_BATCH_MAX_WAIT_MS", "2"))
+)
+BATCHING_ENABLED = os.environ.get("ATS_BATCHING", "1") == "1"
+
+def _embedding_key(text):
+    # The loaded backend, not the configured one: ONNX may have fallen back to torch
+    return hashlib.sha256(f"{MODEL_NAME}\0{get_backend().name}\0{text}".encode("utf-8")).hexdigest()
+
+def _make_embedding_cache():
+    store = None
+    cache_path = os.environ.get("ATS_EMBEDDING_CACHE_PATH")
+    if cache_path:
+        store = SQLiteStore(
+            cache_path,
+            table="embeddings",
+            dumps=lambda vector: np.asarray(vector, dtype=np.float32).tobytes(),
+            loads=lambda blob: np.frombuffer(blob, dtype=np.float32)
+        )
+    return LRUCache(maxsize=int(os.environ.get("ATS_EMBEDDING_CACHE_SIZE", "2048")), store=store)
+
+# Normalised embeddings keyed by a hash of the text, shared by resumes and JDs
+embedding_cache = _make_embedding_cache()
+
+def embed_texts(texts):
+    """
+    Return normalised embeddings for texts, one row per text.
+    Cached texts cost a lookup; only the misses go through the transformer,
+    together in a single batch.
+    """
+    keys = [_embedding_key(text) for text in texts]
+    vectors = [embedding_cache.get(key) for key in keys]
+
+    missing = {}
+    for index, vector in enumerate(vectors):
+        if vector is None:
+            missing.setdefault(keys[index], []).append(index)
+
+    if missing:
+        first_indices = [indices[0] for indices in missing.values()]
+        encode = batcher.encode if BATCHING_ENABLED else encode_texts
+        encoded = encode([texts[i] for i in first_indices])
+        for (key, indices), vector in zip(missing.items(), encoded):
+            embedding_cache.put(key, vector)
+            for index in indices:
+                vectors[index] = vector
+
+    return np.vstack(vectors)
+
+# "chunked" scores the whole document with a sliding window; "truncate" keeps the
+# old behaviour of embedding only the first model-length tokens.
+SCORE_MODE = os.environ.get("ATS_SCORE_MODE", "chunked")
+CHUNK_TOKENS = int(os.environ.get("ATS_CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP = int(os.environ.get("ATS_CHUNK_OVERLAP", "32"))
+CHUNK_POOLING = os.environ.get("ATS_CHUNK_POOLING", "mean")
+
+_chunk_cache = LRUCache(maxsize=512)
+
+def _window_tokens(max_tokens):
+    # Leave room for [CLS] and [SEP]
+    return max(1, min(max_tokens, get_backend().tokenizer.model_max_length) - 2)
+
+def chunk_text(text, max_tokens=None, overlap=None):
+    """
+    Split text into overlapping windows of at most max_tokens tokens (special
+    tokens included). Returns a list of (chunk_text, token_count); every chunk is
+    a verbatim slice of the input, so its embedding can be cached by its text.
+    """
+    max_tokens = max_tokens or CHUNK_TOKENS
+    overlap = CHUNK_OVERLAP if overlap is None else overlap
+    key = f"{_embedding_key(text)}:{max_tokens}:{overlap}"
+    cached = _chunk_cache.get(key)
+    if cached is not None:
+        return cached
+
+    tokenizer = get_backend().tokenizer
+    window = _window_tokens(max_tokens)
+    step = max(1, window - overlap)
+    with tokenizer_lock:
+        offsets = tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            verbose=False
+        )['offset_mapping']
+
+    if len(offsets) <= window:
+        chunks = [(text, len(offsets))]
+    else:
+        chunks = []
+        for start in range(0, len(offsets), step):
+            span = offsets[start:start + window]
+            chunks.append((text[span[0][0]:span[-1][1]], len(span)))
+            if start + window >= len(offsets):
+                break
+
+    _chunk_cache.put(key, chunks)
+    return chunks
+
+def section_chunks(text, max_tokens=None, overlap=None):
+    """
+    chunk_text() along the document's section boundaries (see parse_resume):
+    consecutive sections are packed whole into windows, and only a section
+    longer than a window is split, so no chunk mixes the end of one section
+    with the start of an unrelated one. Text without headings is chunked as-is.
+    """
+    sections = [section.text() for section in parse_resume(text).sections]
+    sections = [section for section in sections if section.strip()]
+    if len(sections) <= 1:
+        return chunk_text(text, max_tokens, overlap)
+
+    window = _window_tokens(max_tokens or CHUNK_TOKENS)
+    chunks = []
+    pending = []
+    pending_tokens = 0
+    for section in sections:
+        pieces = chunk_text(section, max_tokens, overlap)
+        if len(pieces) == 1 and pending_tokens + pieces[0][1] <= window:
+            pending.append(pieces[0][0])
+            pending_tokens += pieces[0][1]
+            continue
+        if pending:
+            chunks.append(('\n'.join(pending), pending_tokens))
+        if len(pieces) == 1:
+            pending, pending_tokens = [pieces[0][0]], pieces[0][1]
+        else:
+            chunks.extend(pieces)
+            pending, pending_tokens = [], 0
+    if pending:
+        chunks.append(('\n'.join(pending), pending_tokens))
+    return chunks
+
+def pool_embeddings(vectors, weights=None, pooling=None):
+    """
+    Combine chunk embeddings into one normalised document embedding.
+    pooling is "mean", "max" or "weighted" (mean weighted by chunk token count).
+    """
+    pooling = pooling or CHUNK_POOLING
+    if pooling == "max":
+        pooled = vectors.max(axis=0)
+    elif pooling == "weighted" and weights is not None and sum(weights) > 0:
+        pooled = np.average(vectors, axis=0, weights=weights)
+    elif pooling in ("mean", "weighted"):
+        pooled = vectors.mean(axis=0)
+    else:
+        raise ValueError(f"Unsupported pooling: {pooling}")
+    norm = np.linalg.norm(pooled)
+    return pooled / norm if norm > 0 else pooled
+
+def embed_documents(texts, mode=None, pooling=None):
+    """
+    Embed whole documents. In chunked mode every chunk of every document goes
+    through embed_texts() in a single call (one batch, cached per chunk) and the
+    chunk vectors are pooled back into one row per document. Chunks follow
+    section boundaries (see section_chunks).
+    """
+    mode = mode or SCORE_MODE
+    if mode == "truncate":
+        return embed_texts(texts)
+    if mode != "chunked":
+        raise ValueError(f"Unsupported scoring mode: {mode}")
+
+    return _embed_chunked([section_chunks(text) for text in texts], pooling=pooling)
+
+def _embed_chunked(chunked, pooling=None):
+    """One pooled row per list of (chunk, token_count), with every chunk embedded in one embed_texts() call"""
+    vectors = embed_texts([chunk for chunks in chunked for chunk, _ in chunks])
+
+    documents = []
+    offset = 0
+    for chunks in chunked:
+        rows = vectors[offset:offset + len(chunks)]
+        documents.append(pool_embeddings(rows, weights=[count for _, count in chunks], pooling=pooling))
+        offset += len(chunks)
+    return np.vstack(documents)
+
+def calculate_ats_score(resume_text, job_description, mode=None, pooling=None):
     """
     Calculates semantic similarity score between resume and job description
     using transformer embeddings.
     """
-    # Tokenize and encode
-    encoded_input = _tokenizer(
-        [resume_text, job_description],
-        padding=True,
-        truncation=True,
-        return_tensors='pt'
-    )
+    resume_vector, jd_vector = embed_documents([resume_text, job_description], mode=mode, pooling=pooling)
 
-    with torch.no_grad():
-        model_output = _model(**encoded_input)
+    # Cosine similarity of normalised vectors
+    return float(np.dot(resume_vector, jd_vector))
 
-    # Mean Pooling
-    embeddings = mean_pooling(model_output, encoded_input['attention_mask'])
+# A requirement counts as covered when some resume section is at least this similar to it
+COVERAGE_THRESHOLD = float(os.environ.get("ATS_COVERAGE_THRESHOLD", "0.5"))
 
-    # Normalize
-    embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+_requirement_split = re.compile(r"(?:\n|(?<=[.;!?])\s+)")
+_bullet_prefix = re.compile(r"^\s*(?:[-*•▪–·]|\d+[.)])\s*")
 
-    # Cosine similarity
-    similarity = torch.nn.functional.cosine_similarity(embeddings[0], embeddings[1], dim=0)
+def split_requirements(job_description, min_words=3):
+    """Split a job description into requirement sentences / bullet lines"""
+    requirements = []
+    for piece in _requirement_split.split(job_description):
+        piece = _bullet_prefix.sub("", piece).strip()
+        if len(piece.split()) >= min_words:
+            requirements.append(piece)
+    return requirements
+
+def section_coverage(resume_text, job_description, threshold=None):
+    """
+    Score every resume section against every job requirement.
+
+    Sections (from parse_resume) and requirement sentences are embedded
+    together in one batch. As in embed_documents, a text longer than the
+    model length is split with chunk_text() and its chunk vectors pooled
+    (in "truncate" mode it is cut instead). The full section x requirement
+    cosine matrix is a single matmul. Returns per-requirement best matches
+    and per-section coverage, plus the overall fraction of requirements covered.
+    """
+    threshold = COVERAGE_THRESHOLD if threshold is None else threshold
+    sections = [section for section in parse_resume(resume_text).sections if section.text().strip()]
+    requirements = split_requirements(job_description) or [job_description.strip()]
+    if not sections or not requirements[0]:
+        return {"coverage": 0.0, "mean_best_score": 0.0, "threshold": threshold, "sections": [], "requirements": []}
+
+    texts = [section.text() for section in sections] + requirements
+    if SCORE_MODE == "truncate":
+        vectors = embed_texts(texts)
+    else:
+        vectors = _embed_chunked([chunk_text(text) for text in texts])
+    matrix = vectors[:len(sections)] @ vectors[len(sections):].T
 
-    return similarity.item()
+    best_section = matrix.argmax(axis=0)
+    best_score = matrix.max(axis=0)
+    covered = matrix >= threshold
+
+    return {
+        "coverage": round(float(covered.any(axis=0).mean()), 4),
+        "mean_best_score": round(float(best_score.mean()), 4),
+        "threshold": threshold,
+        "sections": [
+            {
+                "title": section.title or "(header)",
+                "kind": section.kind,
+                "best_score": round(float(matrix[i].max()), 4),
+                "requirements_covered": int(covered[i].sum()),
+            }
+            for i, section in enumerate(sections)
+        ],
+        "requirements": [
+            {
+                "text": requirement,
+                "best_section": sections[best_section[j]].title or "(header)",
+                "score": round(float(best_score[j]), 4),
+                "covered": bool(covered[:, j].any()),
+            }
+            for j, requirement in enumerate(requirements)
+        ],
+    }
+
+def score_matrix(resume_texts, job_descriptions, mode=None, pooling=None):
+    """
+    Score many resumes against many job descriptions at once.
+    Every document is embedded once (duplicates and cached texts for free) and
+    the full (n_resumes, n_job_descriptions) cosine matrix is one matmul.
+    """
+    resume_texts = list(resume_texts)
+    vectors = embed_documents(resume_texts + list(job_descriptions), mode=mode, pooling=pooling)
+    return vectors[:len(resume_texts)] @ vectors[len(resume_texts):].T
+
+# "semantic" (transformer only), "lexical" (BM25 only) or "hybrid" (BM25 shortlist, transformer rescoring)
+SCORE_TIER = os.environ.get("ATS_SCORE_TIER", "semantic")
+PREFILTER_SHORTLIST = int(os.environ.get("ATS_PREFILTER_SHORTLIST", "50"))
+
+def tiered_score_matrix(resume_texts, job_descriptions, tier=None, shortlist=None, mode=None, pooling=None):
+    """
+    score_matrix() with a selectable cost tier. "lexical" scores with BM25 only
+    (no forward pass). "hybrid" uses BM25 to shortlist each job description's
+    `shortlist` best resumes and embeds only the union of those; pairs outside
+    a shortlist are NaN, which top_k_matches() skips.
+    """
+    tier = tier or SCORE_TIER
+    resume_texts = list(resume_texts)
+    job_descriptions = list(job_descriptions)
+    if tier == "semantic":
+        return score_matrix(resume_texts, job_descriptions, mode=mode, pooling=pooling)
+    if tier not in ("lexical", "hybrid"):
+        raise ValueError(f"Unsupported scoring tier: {tier}")
+
+    lexical = bm25_matrix(resume_texts, job_descriptions)
+    if tier == "lexical":
+        return lexical
+
+    shortlist = min(shortlist or PREFILTER_SHORTLIST, len(resume_texts))
+    if shortlist >= len(resume_texts):
+        return score_matrix(resume_texts, job_descriptions, mode=mode, pooling=pooling)
+    # (shortlist, n_job_descriptions) resume indices
+    shortlisted = np.argpartition(-lexical, shortlist - 1, axis=0)[:shortlist]
+    rows = np.unique(shortlisted)
+    semantic = score_matrix([resume_texts[i] for i in rows], job_descriptions, mode=mode, pooling=pooling)
+
+    matrix = np.full(lexical.shape, np.nan, dtype=np.float32)
+    columns = np.broadcast_to(np.arange(len(job_descriptions)), shortlisted.shape)
+    matrix[shortlisted, columns] = semantic[np.searchsorted(rows, shortlisted), columns]
+    return matrix
+
+def top_k_matches(matrix, k=5, by="role"):
+    """
+    Rank a score_matrix() result.
+    by="role" yields, for each job description (column), its k best resumes;
+    by="candidate" yields, for each resume (row), its k best job descriptions.
+    Yields (index, [(other_index, score), ...]) with scores in descending order.
+    Unscored (NaN) pairs are left out.
+    """
+    if by == "role":
+        matrix = matrix.T
+    elif by != "candidate":
+        raise ValueError(f"Unsupported ranking: {by}")
+
+    k = min(k, matrix.shape[1])
+    if k <= 0:
+        return
+    # argpartition finds the top k per row in linear time; only those k get sorted.
+    # NaN sorts last, so unscored pairs only surface when a row has fewer than k scores
+    top = np.argpartition(-matrix, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(matrix, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    for index in range(matrix.shape[0]):
+        yield index, [(int(other), float(score)) for other, score in zip(top[index], top_scores[index])
+                      if not np.isnan(score)]
 
 def create_docx(text):
     """
@@ -89,48 +597,19 @@ def create_docx(text):
     """
     doc = Document()
     
-    # Define section headings to be formatted in bold
-    section_headings = [
-        "EXPERIENCE", "EDUCATION", "PROJECTS", "SKILLS", 
-        "CERTIFICATIONS & WORKSHOPS", "EXTRACURRICULARS"
-    ]
-    
-    # Process text by paragraphs
-    for paragraph in text.split('\n'):
+    # Headings bold and larger, skill categories bold, entry titles (roles, projects) italic
+    for style, paragraph in parse_resume(text).paragraphs():
         if not paragraph.strip():  # Skip empty paragraphs
             continue
-            
-        # Check if the paragraph is a section heading
-        is_heading = False
-        for heading in section_headings:
-            if heading in paragraph:
-                # Add as a heading with proper formatting
-                p = doc.add_paragraph()
-                runner = p.add_run(paragraph)
-                runner.bold = True
-                runner.font.size = docx.shared.Pt(14)
-                is_heading = True
-                break
-                
-        # Check if it's a skill category
-        if not is_heading and any(category in paragraph for category in 
-                               ["Programming Languages:", "Tools & Technologies:", 
-                                "Soft Skills:", "Languages:"]):
-            p = doc.add_paragraph()
-            runner = p.add_run(paragraph)
+        if style == "heading":
+            runner = doc.add_paragraph().add_run(paragraph)
             runner.bold = True
-            
-        # Check if it's a project title or job title
-        elif not is_heading and any(title in paragraph for title in 
-                                  ["Frontend Developer Intern", "Event Tech Innovator", 
-                                   "Real-time Emergency Response Application", 
-                                   "Student Feedback Analyzer"]):
-            p = doc.add_paragraph()
-            runner = p.add_run(paragraph)
-            runner.italic = True
-            
-        # Regular paragraph
-        elif not is_heading:
+            runner.font.size = docx.shared.Pt(14)
+        elif style == "skill_category":
+            doc.add_paragraph().add_run(paragraph).bold = True
+        elif style == "title":
+            doc.add_paragraph().add_run(paragraph).italic = True
+        else:
             doc.add_paragraph(paragraph)
     
     # Save to BytesIO object
@@ -142,101 +621,68 @@ def create_pdf(text):
     """
     Create a PDF document from text with proper formatting for section headings
     """
-    output = BytesIO()
-    c = canvas.Canvas(output, pagesize=letter)
-    width, height = letter
-    
-    # Define section headings and special content
-    section_headings = [
-        "EXPERIENCE", "EDUCATION", "PROJECTS", "SKILLS", 
-        "CERTIFICATIONS & WORKSHOPS", "EXTRACURRICULARS"
-    ]
-    
-    skill_categories = [
-        "Programming Languages:", "Tools & Technologies:", 
-        "Soft Skills:", "Languages:"
-    ]
-    
-    special_titles = [
-        "Frontend Developer Intern", "Event Tech Innovator", 
-        "Real-time Emergency Response Application", 
-        "Student Feedback Analyzer"
-    ]
-    
-    # Configure text rendering
-    y_position = height - 50  # Start from top with margin
-    line_height = 14
-    margin = 50
-    usable_width = width - 2 * margin
-    
-    # Split text into paragraphs and process each one
-    for paragraph in text.split('\n'):
-        if not paragraph.strip():  # Skip empty paragraphs
-            y_position -= line_height / 2
-            continue
-        
-        # Determine paragraph type and apply appropriate formatting
-        is_heading = any(heading in paragraph for heading in section_headings)
-        is_skill_category = any(category in paragraph for category in skill_categories)
-        is_special_title = any(title in paragraph for title in special_titles)
-        
-        # Set appropriate font based on paragraph type
-        if is_heading:
-            c.setFont("Helvetica-Bold", 14)
-            y_position -= 5  # Extra space before headings
-        elif is_skill_category:
-            c.setFont("Helvetica-Bold", 11)
-        elif is_special_title:
-            c.setFont("Helvetica-Oblique", 11)
-        else:
-            c.setFont("Helvetica", 11)
-            
-        # Simple text wrapping
-        words = paragraph.split()
-        line = ""
-        for word in words:
-            test_line = line + " " + word if line else word
-            line_width = c.stringWidth(test_line, c._fontname, c._fontsize)
-            
-            if line_width <= usable_width:
-                line = test_line
-            else:
-                # Draw the line and move down
-                c.drawString(margin, y_position, line)
-                y_position -= line_height
-                line = word
-                
-                # Check if we need a new page
-                if y_position < margin:
-                    c.showPage()
-                    # Reset font since showPage() resets graphics state
-                    if is_heading:
-                        c.setFont("Helvetica-Bold", 14)
-                    elif is_skill_category:
-                        c.setFont("Helvetica-Bold", 11)
-                    elif is_special_title:
-                        c.setFont("Helvetica-Oblique", 11)
-                    else:
-                        c.setFont("Helvetica", 11)
-                    y_position = height - 50
-        
-        # Draw the last line of the paragraph
-        if line:
-            c.drawString(margin, y_position, line)
-            
-            # Extra spacing after different paragraph types
-            if is_heading:
-                y_position -= line_height * 2  # More space after headings
-            elif is_skill_category or is_special_title:
-                y_position -= line_height * 1.5  # More space after special items
-            else:
-                y_position -= line_height * 1.3  # Standard paragraph spacing
-        
-        # Check if we need a new page
-        if y_position < margin:
-            c.showPage()
-            c.setFont("Helvetica", 11)  # Reset to default font
-            y_position = height - 50
-    
-    c.save()
-    return output
+    # Paragraph styles come from the shared section tree; layout and wrapping from the formatter
+    return render_pdf(parse_resume(text).paragraphs())
+
+RENDERERS = {"docx": create_docx, "pdf": create_pdf}
+
+# Rendered downloads keyed by format and a hash of the text
+render_cache = LRUCache(maxsize=int(os.environ.get("ATS_RENDER_CACHE_SIZE", "128")))
+_render_lock = threading.Lock()
+_render_inflight = {}
+_background_executor = None
+_background_pid = None
+
+def render_document(text, format):
+    """
+    Return text rendered as a DOCX or PDF file (bytes), from the render cache
+    when possible. Concurrent requests for the same document share one render.
+    """
+    if format not in RENDERERS:
+        raise ValueError(f"Unsupported render format: {format}")
+    key = f"{format}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+    data = render_cache.get(key)
+    if data is not None:
+        return data
+
+    with _render_lock:
+        future = _render_inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _render_inflight[key] = Future()
+    if not owner:
+        return future.result()
+
+    try:
+        data = RENDERERS[format](text).getvalue()
+        render_cache.put(key, data)
+        future.set_result(data)
+        return data
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _render_lock:
+            _render_inflight.pop(key, None)
+
+def _log_prerender_failure(future):
+    if future.exception() is not None:
+        logger.error(f"Pre-rendering failed: {str(future.exception())}")
+
+def submit_background(func, *args, **kwargs):
+    """Run func on this process's small background pool (pre-rendering, rescoring); returns a Future"""
+    global _background_executor, _background_pid
+    with _render_lock:
+        if _background_executor is None or _background_pid != os.getpid():
+            _background_executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("ATS_BACKGROUND_WORKERS", "4")), thread_name_prefix="background")
+            _background_pid = os.getpid()
+        executor = _background_executor
+    return executor.submit(func, *args, **kwargs)
+
+def prerender_documents(text):
+    """Render every download format in the background, so the first download is a cache hit"""
+    futures = [submit_background(render_document, text, format) for format in RENDERERS]
+    for future in futures:
+        future.add_done_callback(_log_prerender_failure)
+    return futures
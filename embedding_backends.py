@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_CACHE_DIR = os.environ.get("ATS_ONNX_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ats_onnx"))
+
+# Fast tokenizers switch truncation/padding on the shared Rust tokenizer for
+# every call, so concurrent calls with different settings corrupt each other.
+# Every use of a backend's tokenizer goes through this lock.
+tokenizer_lock = threading.Lock()
+
+def mean_pooling(model_output, attention_mask):
+    token_embeddings = model_output[0]  # First element: token embeddings
+    input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
+    return (token_embeddings * input_mask_expanded).sum(1) / input_mask_expanded.sum(1)
+
+def _normalize(embeddings):
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+class TorchBackend:
+    """
+    Reference backend: fp32 PyTorch model, mean pooling, L2 normalisation
+    """
+    name = "torch"
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.tokenizer = None
+        self.model = None
+
+    def load(self):
+        from transformers import AutoTokenizer, AutoModel
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = AutoModel.from_pretrained(self.model_name)
+        self.model.eval()
+        return self
+
+    def encode(self, texts):
+        import torch
+
+        with tokenizer_lock:
+            encoded_input = self.tokenizer(list(texts), padding=True, truncation=True, return_tensors='pt')
+        with torch.no_grad():
+            model_output = self.model(**encoded_input)
+        embeddings = mean_pooling(model_output, encoded_input['attention_mask'])
+        embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        return embeddings.numpy().astype(np.float32)
+
+class OnnxBackend:
+    """
+    ONNX Runtime CPU backend. On first load the PyTorch model is exported to
+    ONNX and, unless quantize=False, dynamically quantized to int8; both files are
+    kept in cache_dir so later processes only pay for creating the session.
+    """
+    name = "onnx"
+
+    def __init__(self, model_name, cache_dir=ONNX_CACHE_DIR, quantize=True):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.quantize = quantize
+        self.tokenizer = None
+        self.session = None
+        self._input_names = ()
+
+    def _model_dir(self):
+        return os.path.join(self.cache_dir, self.model_name.strip("/").replace("/", "__"))
+
+    def model_path(self):
+        return os.path.join(self._model_dir(), "model.int8.onnx" if self.quantize else "model.onnx")
+
+    def export(self):
+        """Export (and quantize) the model if the cached file is missing; returns its path"""
+        path = self.model_path()
+        if os.path.exists(path):
+            return path
+
+        import torch
+        from transformers import AutoTokenizer, AutoModel
+
+        os.makedirs(self._model_dir(), exist_ok=True)
+        fp32_path = os.path.join(self._model_dir(), "model.onnx")
+        if not os.path.exists(fp32_path):
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model = AutoModel.from_pretrained(self.model_name)
+            model.eval()
+            sample = tokenizer(["warmup export"], return_tensors='pt')
+            input_names = list(sample.keys())
+
+            class _Exportable(torch.nn.Module):
+                # Positional inputs in, last_hidden_state out: the shape the exporter expects
+                def __init__(self):
+                    super().__init__()
+                    self.model = model
+
+                def forward(self, *inputs):
+                    return self.model(**dict(zip(input_names, inputs)))[0]
+
+            dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+            dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+            # Write to a temp name first so a concurrent worker never sees a partial file
+            tmp_path = f"{fp32_path}.{os.getpid()}.tmp"
+            with torch.no_grad():
+                torch.onnx.export(
+                    _Exportable(),
+                    tuple(sample[name] for name in input_names),
+                    tmp_path,
+                    input_names=input_names,
+                    output_names=["last_hidden_state"],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=14,
+                    dynamo=False
+                )
+            os.replace(tmp_path, fp32_path)
+            logger.info(f"Exported {self.model_name} to {fp32_path}")
+
+        if self.quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, path)
+            logger.info(f"Quantized {self.model_name} to {path}")
+        return path
+
+    def load(self):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        path = self.export()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = int(os.environ.get("ATS_ONNX_THREADS", "0"))
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = tuple(i.name for i in self.session.get_inputs())
+        return self
+
+    def encode(self, texts):
+        with tokenizer_lock:
+            encoded_input = self.tokenizer(list(texts), padding=True, truncation=True, return_tensors='np')
+        feeds = {name: encoded_input[name].astype(np.int64) for name in self._input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = encoded_input['attention_mask'][..., None].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return _normalize(embeddings).astype(np.float32)
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+def load_backend(name, model_name):
+    """
+    Load the named backend. Anything other than torch falls back to torch
+    (with a warning) if its runtime is missing or the export fails.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unsupported embedding backend: {name}")
+    start = time.perf_counter()
+    try:
+        backend = BACKENDS[name](model_name).load()
+    except Exception as e:
+        if name == TorchBackend.name:
+            raise
+        logger.warning(f"Embedding backend '{name}' unavailable ({e}); falling back to torch")
+        backend = TorchBackend(model_name).load()
+    logger.info(f"Loaded {model_name} with {backend.name} backend in {time.perf_counter() - start:.2f}s")
+    return backend
+
+SAMPLE_PAIRS = [
+    ("Senior Python developer with 6 years of Flask, PostgreSQL and AWS experience.",
+     "We are hiring a backend engineer to build Python web services on AWS."),
+    ("Frontend developer skilled in React, TypeScript and accessible UI design.",
+     "Looking for a data scientist with strong statistics and machine learning background."),
+    ("Registered nurse with ICU experience and BLS/ACLS certification.",
+     "Hospital seeks critical care nurse for night shifts."),
+    ("Project manager, PMP certified, delivered ERP migrations for retail clients.",
+     "Seeking an agile delivery lead to coordinate cross-functional software teams."),
+]
+
+def check_backend_parity(candidate, reference, pairs=None):
+    """
+    Compare two loaded backends on (resume, job description) pairs.
+    Reports how far the candidate's cosine scores and embeddings drift from the
+    reference, so a faster backend can be adopted with known accuracy cost.
+    """
+    pairs = pairs or SAMPLE_PAIRS
+    texts = [text for pair in pairs for text in pair]
+
+    timings = {}
+    vectors = {}
+    for backend in (reference, candidate):
+        start = time.perf_counter()
+        vectors[backend] = backend.encode(texts)
+        timings[backend.name] = round(time.perf_counter() - start, 4)
+
+    ref_vectors, cand_vectors = vectors[reference], vectors[candidate]
+    ref_scores = (ref_vectors[0::2] * ref_vectors[1::2]).sum(axis=1)
+    cand_scores = (cand_vectors[0::2] * cand_vectors[1::2]).sum(axis=1)
+    score_drift = np.abs(ref_scores - cand_scores)
+    embedding_cosine = (ref_vectors * cand_vectors).sum(axis=1)
+
+    return {
+        "reference": reference.name,
+        "candidate": candidate.name,
+        "pairs": len(pairs),
+        "max_score_drift": float(score_drift.max()),
+        "mean_score_drift": float(score_drift.mean()),
+        "min_embedding_cosine": float(embedding_cosine.min()),
+        "encode_seconds": timings,
+    }
+
+if __name__ == "__main__":
+    # python embedding_backends.py  ->  ONNX vs PyTorch parity report
+    logging.basicConfig(level=logging.INFO)
+    model_name = os.environ.get("ATS_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+    report = check_backend_parity(OnnxBackend(model_name).load(), TorchBackend(model_name).load())
+    print(json.dumps(report, indent=2))
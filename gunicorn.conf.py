@@ -0,0 +1,36 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn main:app` from the project root.
+import os
+import sys
+
+# Import the app once in the master; workers are forked from it. Not under
+# --reload, which needs each worker to import the app itself.
+reload = "--reload" in sys.argv[1:] + os.environ.get("GUNICORN_CMD_ARGS", "").split()
+preload_app = not reload and os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+def when_ready(server):
+    """
+    Load the ATS scoring model in the master before any worker is forked, so the
+    weights are shared copy-on-write instead of being loaded once per worker.
+    Skipped under --reload, where workers must re-import changed modules.
+    """
+    if server.cfg.reload or os.environ.get("ATS_PRELOAD_MODEL", "1") != "1":
+        return
+    from document_processor import warmup
+    try:
+        warmup(run_inference=False)
+    except Exception as e:
+        # Workers load the model lazily on first use instead
+        server.log.warning(f"ATS model preload failed: {e}")
+        return
+    server.log.info("ATS scoring model loaded in master")
+
+def post_worker_init(worker):
+    """Run one tiny forward pass per worker so the first request is not cold."""
+    if os.environ.get("ATS_WARMUP_WORKERS", "1") != "1":
+        return
+    from document_processor import warmup
+    try:
+        warmup(run_inference=True)
+    except Exception as e:
+        worker.log.warning(f"ATS model warmup failed: {e}")
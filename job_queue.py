@@ -0,0 +1,217 @@
+import os
+import time
+import json
+import uuid
+import logging
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Statuses of a job that has not finished; such records are never evicted
+UNFINISHED = ("queued", "running")
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when max_pending jobs are already waiting or running"""
+
+class JobQueue:
+    """
+    In-process background job runner; no external broker needed.
+
+    Jobs run on a bounded thread pool owned by the worker process that accepted
+    them. Their status and results are written to a SQLite file, so a poll for
+    /jobs/<id> is answered by whichever gunicorn worker receives it. Records
+    expire after `ttl` seconds and are purged at most every `purge_interval`
+    seconds when jobs are submitted; the least recently used finished ones are
+    evicted once the store holds more than `max_bytes`.
+
+    Unfinished records carry the pid of the owning worker and a heartbeat that
+    worker refreshes every `heartbeat_interval` seconds. If the worker dies
+    (OOM kill, gunicorn timeout) the heartbeat stops, and get() reports the
+    job as failed once it is older than `stale_after` seconds.
+    """
+
+    def __init__(self, path, workers=4, max_pending=32, ttl=3600, max_bytes=None, purge_interval=60,
+                 heartbeat_interval=10, stale_after=60):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.purge_interval = purge_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.store = SQLiteStore(
+            path,
+            table="jobs",
+            dumps=lambda record: json.dumps(record).encode("utf-8"),
+            loads=lambda blob: json.loads(bytes(blob).decode("utf-8")),
+            ttl=ttl,
+            max_bytes=max_bytes
+        )
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        # Serialises read-modify-write of records between the job, its progress reports and the heartbeat
+        self._records_lock = threading.Lock()
+        self._current = threading.local()
+        self._owned = set()
+        self._executor = None
+        self._pid = None
+        self._queued = 0
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _get_executor(self):
+        # Pools do not survive a fork; each gunicorn worker gets its own
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+                self._pid = os.getpid()
+                self._queued = self._running = 0
+                self._owned = set()
+                threading.Thread(target=self._heartbeat, args=(self._pid,), name="job-heartbeat",
+                                 daemon=True).start()
+            return self._executor
+
+    def _heartbeat(self, pid):
+        while self._pid == pid:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                owned = list(self._owned)
+            for job_id in owned:
+                try:
+                    self._update(job_id, only_unfinished=True, heartbeat=time.time())
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not refresh heartbeat of job {job_id}: {str(e)}")
+
+    def _update(self, job_id, only_unfinished=False, **fields):
+        """Merge fields into a stored record; unfinished records are pinned against eviction"""
+        with self._records_lock:
+            record = self.store.get(job_id)
+            if record is None or (only_unfinished and record["status"] not in UNFINISHED):
+                return None
+            record.update(fields)
+            self.store.put(job_id, record, pinned=record["status"] in UNFINISHED)
+            return record
+
+    def _purge_if_due(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_purge < self.purge_interval:
+                return
+            self._last_purge = now
+        try:
+            removed = self.store.purge_expired()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not purge expired jobs: {str(e)}")
+            return
+        if removed:
+            logger.info(f"Purged {removed} expired job records")
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) and return the new job id"""
+        self._purge_if_due()
+        executor = self._get_executor()
+        with self._lock:
+            if self._queued + self._running >= self.max_pending:
+                raise QueueFull(f"{self._queued + self._running} jobs already pending")
+            self._queued += 1
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.store.put(job_id, {"id": job_id, "status": "queued", "created": now, "pid": os.getpid(),
+                                "heartbeat": now}, pinned=True)
+        with self._lock:
+            self._owned.add(job_id)
+        executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        now = time.time()
+        if self._update(job_id, only_unfinished=True, status="running", started=now, heartbeat=now) is None:
+            # Expired, or already reported failed, while it waited for a thread
+            logger.warning(f"Job {job_id} was given up before it started")
+            with self._lock:
+                self._running -= 1
+                self._owned.discard(job_id)
+            return
+
+        self._current.job_id = job_id
+        try:
+            outcome = {"status": "done", "result": func(*args, **kwargs)}
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            outcome = {"status": "failed", "error": str(e)}
+            with self._lock:
+                self.failed += 1
+        finally:
+            self._current.job_id = None
+            with self._lock:
+                self._running -= 1
+
+        # Reloaded rather than kept from the start, so the final record has the progress reported meanwhile
+        with self._records_lock:
+            record = self.store.get(job_id) or {"id": job_id, "created": now}
+            record.update(outcome, finished=time.time())
+            self.store.put(job_id, record)
+        with self._lock:
+            self._owned.discard(job_id)
+
+    def report_progress(self, **fields):
+        """
+        Merge fields into the running job's "progress", which /jobs/<id>
+        returns until the job finishes. A no-op when called outside a job.
+        """
+        job_id = getattr(self._current, "job_id", None)
+        if job_id is None:
+            return
+        with self._records_lock:
+            record = self.store.get(job_id)
+            if record is None:
+                return
+            record.setdefault("progress", {}).update(fields)
+            record["heartbeat"] = time.time()
+            self.store.put(job_id, record, pinned=record["status"] in UNFINISHED)
+
+    def get(self, job_id):
+        """
+        The job record ({id, status, created, pid, heartbeat, started, finished,
+        progress, result | error}), or None. An unfinished job whose heartbeat
+        is older than stale_after is marked failed: its worker is gone.
+        """
+        record = self.store.get(job_id)
+        if record is not None and record["status"] in UNFINISHED and \
+                time.time() - record.get("heartbeat", record["created"]) > self.stale_after:
+            logger.warning(f"Job {job_id} lost its worker (pid {record.get('pid')})")
+            record.update(status="failed", error="The worker running this job stopped unexpectedly",
+                          finished=time.time())
+            self.store.put(job_id, record)
+        return record
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queued,
+                "running": self._running,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+jobs = JobQueue(
+    os.environ.get("JOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "ats_jobs.sqlite")),
+    workers=int(os.environ.get("JOB_WORKERS", "4")),
+    max_pending=int(os.environ.get("JOB_MAX_PENDING", "32")),
+    ttl=float(os.environ.get("JOB_TTL", "3600")),
+    max_bytes=int(os.environ.get("JOB_STORE_MAX_BYTES", str(256 * 1024 * 1024))),
+    heartbeat_interval=float(os.environ.get("JOB_HEARTBEAT_INTERVAL", "10")),
+    stale_after=float(os.environ.get("JOB_STALE_AFTER", "60"))
+)
@@ -0,0 +1,187 @@
+"""
+Bounded PDF text extraction.
+
+Kept apart from document_processor so the sandbox processes that run it only
+import pdfminer, not numpy/torch, and stay small enough for a tight memory cap.
+"""
+import io
+import os
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from pdfminer.converter import TextConverter
+from pdfminer.pdfinterp import PDFPageInterpreter
+from pdfminer.pdfinterp import PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+logger = logging.getLogger(__name__)
+
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "50"))
+PDF_MAX_CHARS = int(os.environ.get("PDF_MAX_CHARS", "200000"))
+PDF_TIMEOUT = float(os.environ.get("PDF_EXTRACT_TIMEOUT", "20"))
+PDF_MEMORY_MB = int(os.environ.get("PDF_EXTRACT_MEMORY_MB", "768"))
+PDF_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", "2"))
+# How long a caller waits for a busy pool on top of PDF_TIMEOUT before giving up
+PDF_QUEUE_TIMEOUT = float(os.environ.get("PDF_EXTRACT_QUEUE_TIMEOUT", "120"))
+# Extra time a worker gets past its deadline before it exits outright
+WORKER_GRACE_SECONDS = 5
+
+class PDFExtractionError(ValueError):
+    """The PDF could not be extracted within the page, time or memory limits"""
+
+class _Deadline(BaseException):
+    """
+    Raised inside a sandbox worker when a document runs out of time. A
+    BaseException so that pdfminer's own `except Exception` blocks do not
+    swallow it.
+    """
+
+def _raise_deadline(signum, frame):
+    raise _Deadline()
+
+@contextmanager
+def _open_pdf(source):
+    """A binary file object for a path, bytes, or an already open file"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as fh:
+            yield fh
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        yield source
+
+def iter_pdf_pages(source, max_pages=None):
+    """
+    Yield the text of each page in turn. Parsed page objects are not cached,
+    so memory stays proportional to one page rather than the whole document.
+    source may be a path, bytes or a binary file-like object.
+    """
+    resource_manager = PDFResourceManager()
+    with _open_pdf(source) as fh:
+        for page in PDFPage.get_pages(fh, maxpages=max_pages or 0, caching=False, check_extractable=True):
+            page_text = io.StringIO()
+            converter = TextConverter(resource_manager, page_text)
+            PDFPageInterpreter(resource_manager, converter).process_page(page)
+            converter.close()
+            yield page_text.getvalue()
+
+def extract_pdf_text(source, max_pages=None, max_chars=None):
+    """Concatenate page texts, stopping after max_pages pages or max_chars characters"""
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = PDF_MAX_CHARS if max_chars is None else max_chars
+    pages = []
+    length = 0
+    for page_text in iter_pdf_pages(source, max_pages=max_pages):
+        if max_chars and length + len(page_text) > max_chars:
+            pages.append(page_text[:max_chars - length])
+            logger.info(f"PDF text truncated at {max_chars} characters")
+            break
+        pages.append(page_text)
+        length += len(page_text)
+    return ''.join(pages)
+
+def _init_sandbox(memory_mb):
+    import signal
+    import resource
+
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGALRM, _raise_deadline)
+    signal.signal(signal.SIGXCPU, _raise_deadline)
+
+def _extract_in_sandbox(source, max_pages, max_chars, seconds):
+    import signal
+    import resource
+    import faulthandler
+
+    # Wall-clock and CPU budget for this document only, counted from when it
+    # starts rather than from when it was queued. Both raise _Deadline in the
+    # worker, so only this document fails and the worker is reused
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    # Last resort for a parser stuck in C code, where the signals are never handled
+    faulthandler.dump_traceback_later(seconds + WORKER_GRACE_SECONDS, exit=True)
+    try:
+        return extract_pdf_text(source, max_pages=max_pages, max_chars=max_chars)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        faulthandler.cancel_dump_traceback_later()
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+class SandboxedExtractor:
+    """
+    Runs extract_pdf_text in a reusable pool of small helper processes with a
+    per-document timeout and CPU budget and a per-process memory cap. The
+    limits are enforced inside the worker running the document, so a
+    document that breaks one fails with PDFExtractionError while documents
+    queued behind it carry on. If a worker dies outright, the pool is
+    replaced and the documents that were queued on it are retried once.
+    """
+
+    def __init__(self, workers=PDF_WORKERS, timeout=PDF_TIMEOUT, memory_mb=PDF_MEMORY_MB):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # forkserver children do not inherit the web worker's (torch-sized) address space
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(method),
+                    initializer=_init_sandbox,
+                    initargs=(self.memory_mb,),
+                    max_tasks_per_child=100
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+    def _replace_pool(self, pool):
+        """Forget a broken pool; the next _get_pool starts a fresh one"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def extract(self, source, max_pages=None, max_chars=None):
+        if hasattr(source, "read"):
+            # Open files cannot cross the process boundary; their bytes can
+            source = source.read()
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                future = pool.submit(_extract_in_sandbox, source, max_pages, max_chars, self.timeout)
+                return future.result(timeout=self.timeout + PDF_QUEUE_TIMEOUT)
+            except _Deadline:
+                raise PDFExtractionError(f"PDF extraction took longer than {self.timeout:g}s")
+            except FutureTimeoutError:
+                # Still queued (or a worker is wedged); leave the pool to the other callers
+                future.cancel()
+                raise PDFExtractionError("PDF extraction is busy, please try again")
+            except BrokenProcessPool:
+                # A worker died, which fails every document queued on its pool,
+                # not only the one that killed it
+                self._replace_pool(pool)
+                if attempt:
+                    raise PDFExtractionError("PDF extraction exceeded its resource limits")
+                logger.warning("PDF extraction pool broke; retrying on a new pool")
+            except MemoryError:
+                raise PDFExtractionError(f"PDF extraction needed more than {self.memory_mb} MB")
+
+sandbox = SandboxedExtractor()
@@ -1,7 +1,9 @@
 # ai_processor/resume_optimizer.py
 
 import json
-from ai_processor.ai_router import query_ai_model
+import logging
+from ai_processor.ai_router import query_ai_model, stream_ai_model, parse_json_response, MAX_TOKENS
+from ai_processor.prompt_builder import fit_prompt
 from document_processor import calculate_ats_score
 from dotenv import load_dotenv
 import os
@@ -9,22 +11,14 @@ import os
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Access keys
 nomic_api_key = os.getenv("nk-F7G7L6HC3Us-yTrZn2lFMUP31qka0fl_ATcNhXWKf-g")
 openrouter_api_key = os.getenv("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")
 
-def generate_resume_feedback(resume_text, job_description, provider="groq", model="llama3-70b-8192"):
-    """
-    Process resume + JD through selected LLM API and return feedback + ATS score.
-
-    Returns:
-        dict: {
-            "suggestions": [str, ...],
-            "optimized_resume": str,
-            "ats_score": float
-        }
-    """
-    prompt = f"""
+def build_feedback_prompt(resume_text, job_description):
+    return f"""
 You are an expert in resume screening and improvement.
 
 Given the following job description:
@@ -49,20 +43,40 @@ Output valid JSON like:
 }}
     """
 
+def _coerce_response(raw_response):
+    """Turn the model output (already parsed by the router, or raw text) into a dict"""
+    if isinstance(raw_response, dict):
+        return raw_response
+    try:
+        return json.loads(raw_response)
+    except (TypeError, json.JSONDecodeError):
+        print("⚠️ Failed to parse JSON from AI response. Returning raw text.")
+        return {
+            "suggestions": ["⚠️ AI returned unstructured text. Please try again."],
+            "optimized_resume": raw_response
+        }
+
+def generate_resume_feedback(resume_text, job_description, provider="groq", model="llama3-70b-8192", use_cache=True):
+    """
+    Process resume + JD through selected LLM API and return feedback + ATS score.
+
+    Returns:
+        dict: {
+            "suggestions": [str, ...],
+            "optimized_resume": str,
+            "ats_score": float
+        }
+    """
     try:
+        prompt = fit_prompt(build_feedback_prompt, resume_text, job_description, provider, model,
+                            max_output_tokens=MAX_TOKENS)
+
         # Call AI model
-        raw_response = query_ai_model(prompt, provider=provider, model=model)
+        raw_response = query_ai_model(prompt, provider=provider, model=model, use_cache=use_cache)
         print("DEBUG raw_response:", raw_response)
 
-        # Try to parse JSON response from the model output
-        try:
-            response = json.loads(raw_response)
-        except json.JSONDecodeError:
-            print("⚠️ Failed to parse JSON from AI response. Returning raw text.")
-            response = {
-                "suggestions": ["⚠️ AI returned unstructured text. Please try again."],
-                "optimized_resume": raw_response
-            }
+        # The router already extracts JSON where it can
+        response = _coerce_response(raw_response)
 
     except Exception as e:
         print(f"❌ Error during AI model call: {e}")
@@ -81,3 +95,35 @@ Output valid JSON like:
     }
 
     return result
+
+def stream_resume_feedback(resume_text, job_description, provider="groq", model="llama3-70b-8192", use_cache=True):
+    """
+    Streaming counterpart of generate_resume_feedback.
+
+    Yields ("score", float) first, since the local ATS score needs no network
+    call, then ("token", str) for each fragment of the LLM completion, and
+    finally ("result", dict) with the same keys generate_resume_feedback returns.
+    """
+    ats_score = calculate_ats_score(resume_text, job_description)
+    yield "score", ats_score
+
+    fragments = []
+    try:
+        prompt = fit_prompt(build_feedback_prompt, resume_text, job_description, provider, model,
+                            max_output_tokens=MAX_TOKENS)
+        for fragment in stream_ai_model(prompt, provider=provider, model=model, use_cache=use_cache):
+            fragments.append(fragment)
+            yield "token", fragment
+        response = _coerce_response(parse_json_response("".join(fragments)))
+    except Exception as e:
+        logger.error(f"Error during AI model call: {str(e)}")
+        response = {
+            "suggestions": [f"An error occurred while querying the AI: {e}"],
+            "optimized_resume": ""
+        }
+
+    yield "result", {
+        "suggestions": response.get("suggestions", []),
+        "optimized_resume": response.get("optimized_resume", ""),
+        "ats_score": ats_score
+    }
@@ -35,10 +35,116 @@ document.addEventListener('DOMContentLoaded', function() {
                 const submitBtn = event.submitter;
                 submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Analyzing...';
                 submitBtn.disabled = true;
+
+                // Show the analysis in this page as it progresses, polling the background job
+                if (window.fetch && window.FormData) {
+                    event.preventDefault();
+                    analyzeInPage(uploadForm, submitBtn);
+                }
             }
         });
     }
+
+    function analyzeInPage(form, submitBtn) {
+        const panel = document.getElementById('stream-results');
+        const scoreEl = document.getElementById('stream-score');
+        const outputEl = document.getElementById('stream-output');
+        let shownProgress = false;
+
+        function resetButton() {
+            submitBtn.innerHTML = '<i class="fas fa-search me-2"></i>Analyze Resume';
+            submitBtn.disabled = false;
+        }
+
+        function showProgress(progress) {
+            if (progress.score === undefined && !progress.text) {
+                return;
+            }
+            shownProgress = true;
+            panel.classList.remove('d-none');
+            if (progress.score !== undefined) {
+                scoreEl.textContent = progress.score + '/100';
+            }
+            if (progress.text) {
+                outputEl.textContent = progress.text;
+                outputEl.scrollTop = outputEl.scrollHeight;
+            }
+        }
+
+        function showResult(result) {
+            panel.classList.remove('d-none');
+            scoreEl.textContent = result.initial_score + '/100';
+            if (result.new_score !== undefined && result.new_score !== null) {
+                document.getElementById('stream-new-score').textContent = result.new_score + '/100';
+                document.getElementById('stream-new-score-group').classList.remove('d-none');
+            }
+            outputEl.classList.add('d-none');
+            document.getElementById('stream-suggestions').textContent = result.suggestions;
+            document.getElementById('stream-rewritten').textContent = result.rewritten_resume;
+            document.getElementById('stream-final').classList.remove('d-none');
+        }
+
+        function poll(statusUrl) {
+            return fetch(statusUrl, { headers: { 'Accept': 'application/json' } })
+                .then(function(response) { return response.json(); })
+                .then(function(job) {
+                    if (job.status === 'done') {
+                        showResult(job.result);
+                    } else if (job.status === 'failed' || job.error) {
+                        panel.classList.remove('d-none');
+                        outputEl.textContent = 'Error processing resume: ' + (job.error || 'unknown error');
+                    } else {
+                        showProgress(job.progress || {});
+                        return new Promise(function(resolve) { setTimeout(resolve, 1000); })
+                            .then(function() { return poll(statusUrl); });
+                    }
+                });
+        }
+
+        const formData = new FormData(form);
+        formData.append('stream', '1');
+        fetch(form.action, { method: 'POST', body: formData, headers: { 'Accept': 'application/json' } })
+            .then(function(response) {
+                if (response.status !== 202) {
+                    throw new Error('Analysis request failed with status ' + response.status);
+                }
+                return response.json();
+            })
+            .then(function(job) { return poll(job.status_url); })
+            .then(resetButton)
+            .catch(function() {
+                // Nothing shown yet: fall back to the regular form submission
+                if (!shownProgress) {
+                    form.submit();
+                } else {
+                    resetButton();
+                }
+            });
+    }
     
+    // Wait for a queued analysis job, then load its results page
+    const pendingJob = document.getElementById('job-pending');
+
+    if (pendingJob) {
+        const pollJob = function() {
+            fetch(pendingJob.dataset.statusUrl, { headers: { 'Accept': 'application/json' } })
+                .then(function(response) { return response.json(); })
+                .then(function(job) {
+                    if (job.status === 'done' || job.status === 'failed' || job.error) {
+                        window.location.href = pendingJob.dataset.resultUrl;
+                    } else {
+                        document.getElementById('job-pending-message').textContent =
+                            job.status === 'queued' ? 'Waiting for a free worker...' : 'Analyzing your resume...';
+                        setTimeout(pollJob, 1500);
+                    }
+                })
+                .catch(function() {
+                    setTimeout(pollJob, 3000);
+                });
+        };
+        pollJob();
+    }
+
     // Initialize tooltips
     const tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
     tooltipTriggerList.map(function (tooltipTriggerEl) {
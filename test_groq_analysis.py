@@ -0,0 +1,66 @@
+import threading
+
+from ai_processor import groq_analysis
+
+RESUME = "Jane Roe\njane.roe@example.com\n\nSKILLS\nPython, SQL"
+JOB_DESCRIPTION = "Backend Engineer\n\nRequirements\n- 3+ years with Python"
+
+def fake_groq(replies):
+    """
+    A call_groq_api stand-in. replies maps a word of the system prompt
+    ("evaluate", "suggestions", "enhance") to a reply, an exception to raise,
+    or a threading.Event to block on.
+    """
+    def call(prompt, system_prompt="", max_tokens=800, temperature=0.2):
+        for word, reply in replies.items():
+            if word in system_prompt:
+                if isinstance(reply, Exception):
+                    raise reply
+                if isinstance(reply, threading.Event):
+                    reply.wait(5)
+                    return "too late"
+                return reply
+        raise AssertionError(f"Unexpected system prompt: {system_prompt}")
+    return call
+
+def test_all_calls_succeed(monkeypatch):
+    monkeypatch.setattr(groq_analysis, "call_groq_api", fake_groq({
+        "evaluate": "MATCH SCORE: 80%",
+        "suggestions": "1. Add metrics",
+        "enhance": "Jane Roe (rewritten)",
+    }))
+    results = groq_analysis.analyze_resume_with_ai(RESUME, JOB_DESCRIPTION, timeout=5)
+    assert results == {
+        "match_analysis": "MATCH SCORE: 80%",
+        "suggestions": "1. Add metrics",
+        "rewritten_resume": "Jane Roe (rewritten)",
+        "errors": {},
+    }
+
+def test_partial_failure_keeps_other_results(monkeypatch):
+    monkeypatch.setattr(groq_analysis, "call_groq_api", fake_groq({
+        "evaluate": "MATCH SCORE: 80%",
+        "suggestions": ValueError("API request failed: 503"),
+        "enhance": "Jane Roe (rewritten)",
+    }))
+    results = groq_analysis.analyze_resume_with_ai(RESUME, JOB_DESCRIPTION, timeout=5)
+    assert results["match_analysis"] == "MATCH SCORE: 80%"
+    assert results["rewritten_resume"] == "Jane Roe (rewritten)"
+    assert results["suggestions"] is None
+    assert results["errors"] == {"suggestions": "API request failed: 503"}
+
+def test_slow_call_times_out(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(groq_analysis, "call_groq_api", fake_groq({
+        "evaluate": "MATCH SCORE: 80%",
+        "suggestions": "1. Add metrics",
+        "enhance": release,
+    }))
+    try:
+        results = groq_analysis.analyze_resume_with_ai(RESUME, JOB_DESCRIPTION, timeout=0.5)
+    finally:
+        release.set()
+    assert results["match_analysis"] == "MATCH SCORE: 80%"
+    assert results["suggestions"] == "1. Add metrics"
+    assert results["rewritten_resume"] is None
+    assert results["errors"] == {"rewritten_resume": "Timed out after 0.5s"}
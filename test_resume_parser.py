@@ -0,0 +1,43 @@
+from ai_processor.resume_parser import ResumeParser
+
+RESUME = """JANE ROE
+jane.roe@example.com | +1 555 0100
+
+SUMMARY
+Backend engineer with eight years of experience.
+
+EXPERIENCE
+SENIOR SOFTWARE ENGINEER
+- Led the billing service migration
+
+ACME CORP
+- Built the public API
+
+SKILLS
+Programming Languages: Python, Go
+
+HOBBIES AND CLUBS
+Chess"""
+
+def test_all_caps_name_stays_in_header():
+    """
+    An all-caps name is the first line, not a section heading
+    """
+    document = ResumeParser().parse(RESUME)
+    header = document.sections[0]
+    assert header.kind == "header"
+    assert header.title is None
+    assert [item.text for item in header.items if item.kind != "blank"] == [
+        "JANE ROE", "jane.roe@example.com | +1 555 0100"
+    ]
+
+def test_all_caps_titles_stay_entries():
+    """
+    All-caps job titles and employers inside EXPERIENCE are entries, not new sections
+    """
+    document = ResumeParser().parse(RESUME)
+    assert [section.kind for section in document.sections] == [
+        "header", "summary", "experience", "skills", "hobbies and clubs"
+    ]
+    entries = [item.text for item in document.section("experience").items if item.kind == "entry"]
+    assert entries == ["SENIOR SOFTWARE ENGINEER", "ACME CORP"]
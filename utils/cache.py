@@ -0,0 +1,211 @@
+# utils/cache.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def thread_connection(local, path, timeout=5.0):
+    """
+    The calling thread's connection to the SQLite file at path, kept on
+    `local` (a threading.local). A forked child opens its own, since a
+    connection must not be shared across processes.
+    """
+    conn = getattr(local, "conn", None)
+    if conn is None or getattr(local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(path, timeout=timeout)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        local.conn = conn
+        local.pid = os.getpid()
+    return conn
+
+class SQLiteStore:
+    """
+    Small persistent key/value store backed by a SQLite file.
+    Safe to share between threads and between forked gunicorn workers: every
+    thread (and every process) opens its own connection lazily.
+
+    ttl (seconds) expires entries on read; max_bytes evicts the least recently
+    used entries once the stored values exceed that size. Entries put with
+    pinned=True are never evicted (they still expire).
+    """
+
+    def __init__(self, path, table="cache", dumps=pickle.dumps, loads=pickle.loads, ttl=None, max_bytes=None):
+        self.path = path
+        self.table = table
+        self.dumps = dumps
+        self.loads = loads
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            # Columns added after the first release of this table
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if "accessed" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN accessed REAL NOT NULL DEFAULT 0")
+            if "size" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            if "pinned" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0")
+
+    def _connect(self):
+        return thread_connection(self._local, self.path)
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute(
+            f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None and self.ttl is not None and row[1] + self.ttl < time.time():
+            self.delete(key)
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        if self.max_bytes is not None:
+            # Recency only matters when there is a size budget to evict against
+            with conn:
+                conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return self.loads(row[0])
+
+    def put(self, key, value, pinned=False):
+        blob = self.dumps(value)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed, size, pinned) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(blob), now, now, len(blob), int(pinned))
+            )
+            if self.max_bytes is not None:
+                self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in conn.execute(f"SELECT key, size FROM {self.table} WHERE pinned = 0 ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        """Drop expired entries eagerly; returns how many were removed"""
+        if self.ttl is None:
+            return 0
+        with self._connect() as conn:
+            return conn.execute(
+                f"DELETE FROM {self.table} WHERE created < ?", (time.time() - self.ttl,)
+            ).rowcount
+
+    def __len__(self):
+        return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self):
+        entries, size = self._connect().execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with hit/miss counters.
+
+    If a store (e.g. SQLiteStore) is given, it acts as a second tier: entries
+    evicted from memory, or lost on worker restart, are still found on disk.
+    """
+
+    def __init__(self, maxsize=1024, store=None):
+        self.maxsize = maxsize
+        self.store = store
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+
+        if self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.store is not None:
+            self.store.put(key, value)
+
+    def _remember(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "persistent": self.store is not None,
+            }
@@ -0,0 +1,98 @@
+# utils/http_client.py
+import os
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "60"))
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", "8"))
+RETRY_AFTER_MAX = float(os.environ.get("HTTP_RETRY_AFTER_MAX", "30"))
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(provider):
+    """
+    Keep-alive session for one provider, so repeated calls reuse pooled
+    TCP+TLS connections. Sessions are per process: pools are never shared
+    across a fork.
+    """
+    key = (os.getpid(), provider)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sessions[key] = session
+    return session
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), if any"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, response=None):
+    """Retry-After if the server sent one, else exponential backoff with full jitter"""
+    retry_after = _retry_after(response)
+    if retry_after is not None:
+        return min(retry_after, RETRY_AFTER_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def post_json(provider, url, headers=None, json=None, timeout=None, retries=None, stream=False):
+    """
+    POST a JSON body through the provider's pooled session.
+
+    Always sends a (connect, read) timeout. Retries connection failures and
+    429/5xx responses with backoff; read timeouts are not retried, since the
+    provider may already be generating (and billing) the completion. The last
+    response is returned as-is, so callers still decide how to treat errors.
+    """
+    session = get_session(provider)
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    retries = MAX_RETRIES if retries is None else retries
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.post(url, headers=headers, json=json, timeout=timeout, stream=stream)
+        except requests.exceptions.ConnectionError as e:
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"{provider}: connection failed ({e}); retry {attempt + 1}/{retries} in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            delay = backoff_delay(attempt, response)
+            logger.warning(f"{provider}: HTTP {response.status_code}; retry {attempt + 1}/{retries} in {delay:.2f}s")
+            response.close()
+            time.sleep(delay)
+            continue
+
+        return response